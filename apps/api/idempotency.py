@@ -0,0 +1,143 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+
+def _hash(value):
+    return hashlib.sha256(value).hexdigest()
+
+
+def get_fingerprint(request):
+    """
+    Hash of what makes a request: method, path and body. A key sent again
+    with another fingerprint is a client bug, not a retry.
+    """
+    return _hash(b'\n'.join([request.method.encode(), request.get_full_path().encode(), request.body]))
+
+
+def anonymous_scope(value):
+    """
+    Scope of anonymous keys, per `value` identifying the client (the email
+    being registered, for instance), so that two clients picking the same
+    key never get each other's response.
+    """
+    return f'anonymous:{_hash(value.strip().lower().encode())[:32]}'
+
+
+def get_scope(view, request):
+    """
+    Keys are stored per user. Views taking anonymous writes can scope them
+    with a `get_idempotency_scope(request)` method; otherwise anonymous
+    requests share one scope and are told apart by their fingerprint only.
+    """
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    get_idempotency_scope = getattr(view, 'get_idempotency_scope', None)
+    if get_idempotency_scope is not None:
+        return get_idempotency_scope(request)
+    return 'anonymous'
+
+
+def idempotent(view_method):
+    """
+    Decorator for view methods handling writes (`create`, `post`).
+
+    When the request carries an `Idempotency-Key` header, the first successful
+    response is stored for `IDEMPOTENCY_KEY_TTL` and returned as is to any
+    retry with the same key, without running validation, password hashing or
+    inserts again. A retry arriving while the first request is still running
+    gets 409 Conflict, and reusing a key for another request (another method,
+    path or body) gets 422. A request still marked as running after
+    `IDEMPOTENCY_KEY_LEASE` is considered abandoned (its worker died) and the
+    next retry takes it over. Failed requests are not stored, so they can be
+    retried with the same key.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'detail': f"{IDEMPOTENCY_KEY_HEADER} must be at most 255 characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = get_fingerprint(request)
+        scope = get_scope(self, request)
+        now = timezone.now()
+        record = None
+        stored = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if stored is not None:
+            if stored.expires_at <= now:
+                stored.delete()
+            elif stored.fingerprint != fingerprint:
+                return Response(
+                    {'detail': f"This {IDEMPOTENCY_KEY_HEADER} was already used for another request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            elif stored.status_code is not None:
+                response = Response(stored.response_body, status=stored.status_code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            elif not _take_over(stored, now):
+                return _in_progress()
+            else:
+                record = stored
+
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        scope=scope, key=key, request_path=request.path, fingerprint=fingerprint,
+                        expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                    )
+            except IntegrityError:
+                return _in_progress()
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if status.is_success(response.status_code):
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['status_code', 'response_body'])
+        else:
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def _in_progress():
+    return Response(
+        {'detail': f"A request with this {IDEMPOTENCY_KEY_HEADER} is still being processed."},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def _take_over(stored, now):
+    """
+    Claims a key whose request has been running for longer than the lease.
+    The conditional UPDATE lets only one of several concurrent retries win.
+    """
+    return bool(
+        IdempotencyKey.objects.filter(
+            pk=stored.pk, status_code__isnull=True,
+            created_at__lte=now - settings.IDEMPOTENCY_KEY_LEASE,
+        ).update(created_at=now)
+    )
@@ -0,0 +1,229 @@
+"""
+Client side of the `loadtest` command.
+
+Every client process replays the scenario against the server for a fixed
+duration, one request at a time, and returns what it measured. Processes
+are spawned, so this module must not import Django or any model.
+"""
+
+import gzip
+import http.client
+import json
+import random
+import time
+from collections import Counter
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+# The traffic mix seen in production: mostly anonymous reads of the post
+# list, bursts of logins, token refreshes and comment writes.
+DEFAULT_SCENARIO = [
+    {
+        'name': 'list posts',
+        'weight': 90,
+        'method': 'GET',
+        'path': '/api/posts/?page={page}',
+    },
+    {
+        'name': 'login',
+        'weight': 2,
+        'burst': 5,
+        'method': 'POST',
+        'path': '/api/auth/login/',
+        'body': {'username': '{username}', 'password': '{password}'},
+    },
+    {
+        'name': 'refresh token',
+        'weight': 4,
+        'method': 'POST',
+        'path': '/api/auth/token/refresh/',
+        'body': {'refresh': '{refresh}'},
+        'auth': True,
+    },
+    {
+        'name': 'write comment',
+        'weight': 4,
+        'method': 'POST',
+        'path': '/api/comments/',
+        'body': {'post': '{post_id}', 'content': 'Load test comment'},
+        'auth': True,
+    },
+]
+
+# Anonymous readers rarely go past the first pages of the list.
+HOT_PAGES = 5
+
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, br' if brotli is not None else 'gzip',
+}
+
+
+def validate_scenario(steps):
+    """
+    Returns a list of error messages, empty if `steps` is a valid scenario.
+    """
+    if not isinstance(steps, list) or not steps:
+        return ["The scenario must be a non-empty list of steps."]
+    errors = []
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict):
+            errors.append(f"Step {index} is not an object.")
+            continue
+        for key in ('name', 'method', 'path'):
+            if not isinstance(step.get(key), str):
+                errors.append(f"Step {index} has no {key!r}.")
+        if not isinstance(step.get('weight'), (int, float)) or step['weight'] <= 0:
+            errors.append(f"Step {index} needs a positive 'weight'.")
+        if not isinstance(step.get('burst', 1), int) or step.get('burst', 1) < 1:
+            errors.append(f"Step {index} has an invalid 'burst'.")
+    return errors
+
+
+_BROTLI_ERRORS = (brotli.error,) if brotli is not None else ()
+
+
+def _decompress(content, encoding):
+    """
+    Undoes the `Content-Encoding` of a response body.
+    """
+    if encoding == 'gzip':
+        return gzip.decompress(content)
+    if encoding == 'br' and brotli is not None:
+        return brotli.decompress(content)
+    return content
+
+
+def _fill(value, context):
+    """
+    Substitutes the `{placeholders}` of the strings in `value`.
+    """
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, context) for item in value]
+    return value
+
+
+class Client:
+    """
+    One simulated user: a keep-alive connection and the tokens of its
+    current login. Tokens found in any JSON response (`access`, `refresh`)
+    replace the current ones, which follows refresh token rotation.
+    """
+
+    def __init__(self, host, port, data, stats, rng):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.data = data
+        self.stats = stats
+        self.rng = rng
+        self.username = rng.choice(data['usernames'])
+        self.access = self.refresh = None
+
+    def context(self):
+        return {
+            'username': self.username,
+            'password': self.data['password'],
+            'post_id': self.rng.choice(self.data['post_ids']),
+            'page': self.rng.randint(1, max(1, min(self.data['pages'], HOT_PAGES))),
+            'access': self.access or '',
+            'refresh': self.refresh or '',
+        }
+
+    def run_step(self, step, login_step):
+        if step is login_step:
+            # Each burst of logins is a different user signing in.
+            self.username = self.rng.choice(self.data['usernames'])
+        elif step.get('auth') and self.access is None:
+            self.request(login_step)
+        for _ in range(step.get('burst', 1)):
+            self.request(step)
+
+    def request(self, step):
+        context = self.context()
+        path = _fill(step['path'], context)
+        headers = dict(DEFAULT_HEADERS, **step.get('headers', {}))
+        body = None
+        if 'body' in step:
+            body = json.dumps(_fill(step['body'], context))
+            headers['Content-Type'] = 'application/json'
+        if step.get('auth') and self.access:
+            headers['Authorization'] = f'Bearer {self.access}'
+
+        start = time.perf_counter()
+        try:
+            self.connection.request(step['method'], path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            encoding = response.getheader('Content-Encoding')
+            status = response.status
+            if response.will_close:
+                self.connection.close()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            content, encoding, status = b'', None, 0
+        self.stats.record(step['name'], time.perf_counter() - start, status)
+
+        if status in (401, 403) and step.get('auth'):
+            self.access = self.refresh = None
+        elif 200 <= status < 300 and step['method'] != 'GET':
+            # Tokens come from the login and refresh POSTs, whose responses are
+            # compressed too once they grow past COMPRESSION_MIN_SIZE.
+            try:
+                tokens = json.loads(_decompress(content, encoding))
+            except (OSError, EOFError, ValueError, *_BROTLI_ERRORS):
+                return
+            if not isinstance(tokens, dict):
+                return
+            self.access = tokens.get('access', self.access)
+            self.refresh = tokens.get('refresh', self.refresh)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, name, latency, status):
+        self.latencies.setdefault(name, []).append(latency)
+        self.statuses.setdefault(name, Counter())[status] += 1
+
+    def as_dict(self):
+        return {
+            name: {'latencies': latencies, 'statuses': dict(self.statuses[name])}
+            for name, latencies in self.latencies.items()
+        }
+
+
+def run_client(host, port, steps, data, duration, seed):
+    """
+    Replays `steps` for `duration` seconds and returns, per step name, the
+    latencies (seconds) and the count of each response status. A status of
+    0 is a connection error or timeout.
+
+    `data` holds what the placeholders are filled from: the seeded
+    `usernames` and their `password`, the `post_ids` and the number of
+    `pages` of the post list.
+    """
+    rng = random.Random(seed)
+    stats = Stats()
+    login_step = next(
+        (step for step in steps if step['path'].rstrip('/').endswith('/auth/login')),
+        None,
+    )
+    if login_step is None:
+        login_step = next(step for step in DEFAULT_SCENARIO if step['name'] == 'login')
+    weights = [step['weight'] for step in steps]
+
+    client = Client(host, port, data, stats, rng)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        client.run_step(rng.choices(steps, weights)[0], login_step)
+    client.connection.close()
+    return stats.as_dict()
@@ -0,0 +1,58 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ...middleware import brotli
+from ...renderers import ORJSONRenderer, MessagePackRenderer
+from ....blog.models import BlogPost
+from ....blog.serializers import BlogPostSerializer
+from ....users.models import User
+
+
+class Command(BaseCommand):
+    help = "Benchmark bytes on the wire and encode time of a BlogPost list page per renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--rounds', type=int, default=200)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        rounds = options['rounds']
+
+        author = User(id=1, username='benchmark')
+        now = timezone.now()
+        posts = [
+            BlogPost(
+                id=i, author=author, title=f"Benchmark Post {i}",
+                content="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+                created_at=now, updated_at=now, is_published=bool(i % 2),
+            )
+            for i in range(page_size)
+        ]
+        data = {
+            'count': page_size, 'next': None, 'previous': None,
+            'results': BlogPostSerializer(posts, many=True).data,
+        }
+
+        self.stdout.write(
+            f"{'renderer':<12}{'encode us':>12}{'raw B':>10}{'gzip B':>10}{'br B':>10}"
+        )
+        for name, renderer in (
+            ('json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+            ('msgpack', MessagePackRenderer()),
+        ):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                body = renderer.render(data)
+            elapsed = (time.perf_counter() - start) / rounds * 1e6
+
+            gzipped = len(gzip.compress(body, compresslevel=6))
+            br = len(brotli.compress(body, quality=4)) if brotli else '-'
+            self.stdout.write(
+                f"{name:<12}{elapsed:>12.1f}{len(body):>10}{gzipped:>10}{br:>10}"
+            )
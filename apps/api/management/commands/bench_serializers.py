@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...renderers import ORJSONRenderer
+from ....blog.models import BlogPost, Comment
+from ....blog.serializers import (
+    BlogPostSerializer, BlogPostReadSerializer,
+    CommentSerializer, CommentReadSerializer,
+)
+from ....users.models import User
+
+
+class Command(BaseCommand):
+    help = "Benchmark serialization time per 1000 objects, ModelSerializer vs values() read serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=1000)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        rounds = options['rounds']
+
+        author = User(id=1, username='benchmark')
+        post = BlogPost(id=1, author=author)
+        now = timezone.now()
+        content = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+
+        posts = [
+            BlogPost(
+                id=i, author=author, title=f"Post {i}", content=content,
+                created_at=now, updated_at=now, is_published=True,
+            )
+            for i in range(count)
+        ]
+        post_rows = [
+            (p.id, p.title, p.content, author.id, author.username, now, now, True)
+            for p in posts
+        ]
+        comments = [
+            Comment(id=i, post=post, author=author, content=content, created_at=now, updated_at=now)
+            for i in range(count)
+        ]
+        comment_rows = [(c.id, post.id, author.id, c.content, now, now) for c in comments]
+
+        renderer = ORJSONRenderer()
+        self.stdout.write(f"{'serializer':<28}{'ms / 1000 objects':>20}{'same output':>14}")
+        for name, serializer_class, objects, read_serializer_class, rows in (
+            ('BlogPost', BlogPostSerializer, posts, BlogPostReadSerializer, post_rows),
+            ('Comment', CommentSerializer, comments, CommentReadSerializer, comment_rows),
+        ):
+            expected = renderer.render(serializer_class(objects, many=True).data)
+            same = renderer.render(read_serializer_class(rows).data) == expected
+
+            for label, serialize in (
+                (f"{name} ModelSerializer", lambda: serializer_class(objects, many=True).data),
+                (f"{name} values()", lambda: read_serializer_class(rows).data),
+            ):
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    serialize()
+                elapsed = (time.perf_counter() - start) / rounds / count * 1000 * 1000
+                self.stdout.write(f"{label:<28}{elapsed:>20.2f}{str(same):>14}")
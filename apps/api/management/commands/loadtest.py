@@ -0,0 +1,289 @@
+import json
+import math
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...loadtest import DEFAULT_SCENARIO, run_client, validate_scenario
+from ....blog.models import BlogPost
+from ....users.models import User
+
+
+SERVER_COMMANDS = {
+    'gunicorn': [sys.executable, '-m', 'gunicorn', 'config.wsgi', '-c', 'gunicorn.conf.py'],
+    'uvicorn': [sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--no-access-log'],
+}
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class ConnectionSampler(threading.Thread):
+    """
+    Samples the connections open on the database during the run, from
+    `pg_stat_activity`. Only PostgreSQL exposes them.
+    """
+
+    SQL = (
+        "SELECT state, count(*) FROM pg_stat_activity "
+        "WHERE datname = current_database() AND pid <> pg_backend_pid() "
+        "GROUP BY state"
+    )
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        # Runs with its own connection: Django connections are per thread.
+        try:
+            while not self.stopped.wait(self.interval):
+                with connection.cursor() as cursor:
+                    cursor.execute(self.SQL)
+                    self.samples.append({state or 'unknown': count for state, count in cursor.fetchall()})
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the API under gunicorn or uvicorn and replay a weighted traffic scenario from "
+        "several client processes. Reports throughput, p50/p95/p99 latency and error rate "
+        "per endpoint, and database connection usage. Seed the database with `seed_data` first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            help="JSON file with a list of steps; the default is the production traffic mix.",
+        )
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run.")
+        parser.add_argument('--clients', type=int, default=os.cpu_count() or 1, help="Client processes.")
+        parser.add_argument('--server', choices=[*SERVER_COMMANDS, 'none'], default='gunicorn')
+        parser.add_argument('--server-workers', type=int, default=4)
+        parser.add_argument(
+            '--server-settings', default='config.settings_api',
+            help="DJANGO_SETTINGS_MODULE of the server. It must use the same database as this command.",
+        )
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8001',
+            help="Address the server is started on or, with --server none, of a running server.",
+        )
+        parser.add_argument('--prefix', default='loadtest', help="Username prefix used by seed_data.")
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--sample-interval', type=float, default=1.0, help="Seconds between DB samples.")
+        parser.add_argument('--json', dest='json_file', help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        steps = self.load_scenario(options['scenario'])
+        url = urlsplit(options['url'])
+        host, port = url.hostname or '127.0.0.1', url.port or 80
+
+        data = self.get_data(options['prefix'], options['password'])
+        # Don't hold a connection, and don't count it, during the run.
+        connection.close()
+
+        server = None
+        if options['server'] != 'none':
+            server = self.start_server(
+                options['server'], options['server_workers'], options['server_settings'], host, port,
+            )
+        sampler = None
+        if connection.vendor == 'postgresql':
+            sampler = ConnectionSampler(options['sample_interval'])
+
+        try:
+            self.wait_for_server(server, host, port)
+            self.stdout.write(
+                f"Running {options['clients']} clients for {options['duration']:g}s against {host}:{port}..."
+            )
+            if sampler is not None:
+                sampler.start()
+            start = time.perf_counter()
+            # Spawned, so the clients inherit neither the database connection
+            # nor the loaded Django apps.
+            with multiprocessing.get_context('spawn').Pool(options['clients']) as pool:
+                results = pool.starmap(run_client, [
+                    (host, port, steps, data, options['duration'], seed)
+                    for seed in range(options['clients'])
+                ])
+            elapsed = time.perf_counter() - start
+        finally:
+            if sampler is not None and sampler.is_alive():
+                sampler.stop()
+            if server is not None:
+                self.stop_server(server)
+
+        report = self.build_report(steps, results, elapsed, sampler)
+        self.print_report(report)
+        if options['json_file']:
+            with open(options['json_file'], 'w', encoding='utf-8') as json_file:
+                json.dump(report, json_file, indent=2)
+
+    def load_scenario(self, path):
+        if path is None:
+            return DEFAULT_SCENARIO
+        try:
+            with open(path, encoding='utf-8') as scenario_file:
+                steps = json.load(scenario_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read the scenario: {exc}")
+        errors = validate_scenario(steps)
+        if errors:
+            raise CommandError('\n'.join(errors))
+        return steps
+
+    def get_data(self, prefix, password):
+        usernames = list(User.objects.filter(username__startswith=prefix).values_list('username', flat=True))
+        post_ids = list(BlogPost.objects.values_list('id', flat=True))
+        if not usernames or not post_ids:
+            raise CommandError("The database has no load test data, run `manage.py seed_data` first.")
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or len(post_ids)
+        return {
+            'usernames': usernames,
+            'password': password,
+            'post_ids': post_ids,
+            'pages': math.ceil(len(post_ids) / page_size),
+        }
+
+    def start_server(self, name, workers, settings_module, host, port):
+        command = list(SERVER_COMMANDS[name])
+        if name == 'uvicorn':
+            command += ['--host', host, '--port', str(port), '--workers', str(workers)]
+        # Measured like production: without DEBUG (which keeps every query
+        # in memory) and without the query budget checks.
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=settings_module,
+            DJANGO_DEBUG='0',
+            QUERY_BUDGET='off',
+            GUNICORN_BIND=f'{host}:{port}',
+            GUNICORN_WORKERS=str(workers),
+        )
+        log = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=log,
+        )
+        process.log = log
+        return process
+
+    def wait_for_server(self, server, host, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                server.log.seek(0)
+                output = server.log.read().decode(errors='replace').strip()
+                raise CommandError(f"The server exited with code {server.returncode}:\n{output}")
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Nothing is listening on {host}:{port} after {timeout}s.")
+
+    def stop_server(self, server):
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.log.close()
+
+    def build_report(self, steps, results, elapsed, sampler):
+        endpoints = {}
+        all_latencies = []
+        all_statuses = Counter()
+        for step in steps:
+            latencies, statuses = [], Counter()
+            for result in results:
+                if step['name'] in result:
+                    latencies += result[step['name']]['latencies']
+                    statuses.update({int(status): count for status, count in result[step['name']]['statuses'].items()})
+            all_latencies += latencies
+            all_statuses += statuses
+            endpoints[step['name']] = self.summarize(latencies, statuses, elapsed)
+
+        report = {
+            'duration': elapsed,
+            'endpoints': endpoints,
+            'total': self.summarize(all_latencies, all_statuses, elapsed),
+            'db_connections': None,
+        }
+        if sampler is not None and sampler.samples:
+            totals = [sum(sample.values()) for sample in sampler.samples]
+            report['db_connections'] = {
+                'samples': len(totals),
+                'mean': sum(totals) / len(totals),
+                'max': max(totals),
+                'max_active': max(sample.get('active', 0) for sample in sampler.samples),
+                'max_idle_in_transaction': max(
+                    sample.get('idle in transaction', 0) for sample in sampler.samples
+                ),
+            }
+        return report
+
+    @staticmethod
+    def summarize(latencies, statuses, elapsed):
+        latencies = sorted(latencies)
+        count = len(latencies)
+        errors = sum(n for status, n in statuses.items() if status == 0 or status >= 400)
+        return {
+            'requests': count,
+            'throughput': count / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'error_rate': errors / count if count else 0.0,
+            'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        }
+
+    def print_report(self, report):
+        header = (
+            f"{'endpoint':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}  statuses"
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        rows = [*report['endpoints'].items(), ('total', report['total'])]
+        for name, summary in rows:
+            statuses = ', '.join(f"{status}: {n}" for status, n in summary['statuses'].items())
+            self.stdout.write(
+                f"{name:<20}{summary['requests']:>10}{summary['throughput']:>10.1f}"
+                f"{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}"
+                f"{summary['error_rate']:>9.1%}  {statuses}"
+            )
+
+        db_connections = report['db_connections']
+        if db_connections is None:
+            self.stdout.write("DB connections: only sampled on PostgreSQL.")
+        else:
+            self.stdout.write(
+                f"DB connections: mean {db_connections['mean']:.1f}, max {db_connections['max']} "
+                f"(max active {db_connections['max_active']}, "
+                f"max idle in transaction {db_connections['max_idle_in_transaction']}) "
+                f"over {db_connections['samples']} samples."
+            )
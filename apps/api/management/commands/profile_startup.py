@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Runs in a fresh interpreter so that nothing is imported yet. The first
+# request goes through the WSGI handler, like in a gunicorn worker.
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+first_request = None
+if {url!r}:
+    from wsgiref.util import setup_testing_defaults
+    from django.core.wsgi import get_wsgi_application
+    environ = {{'PATH_INFO': {url!r}}}
+    setup_testing_defaults(environ)
+    response = get_wsgi_application()(environ, lambda status, headers: None)
+    b''.join(response)
+    first_request = time.perf_counter() - start
+print(json.dumps({{'setup': setup - start, 'first_request': first_request}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile worker cold start: `-X importtime` breakdown per app in INSTALLED_APPS, "
+        "django.setup() time and time to first request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile-settings', action='append', dest='profiles',
+            help="Settings module to profile, can be repeated (default: the current one).",
+        )
+        parser.add_argument('--url', default='/api/', help="URL requested to measure time to first request.")
+        parser.add_argument('--top', type=int, default=10, help="Number of other top-level packages to show.")
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or [os.environ['DJANGO_SETTINGS_MODULE']]
+        for settings_module in profiles:
+            self.profile(settings_module, options['url'], options['top'])
+
+    def profile(self, settings_module, url, top):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT.format(url=url)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr.splitlines()[-1])
+            return
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        installed_apps = self.get_installed_apps(settings_module)
+
+        # Self time of every imported module, attributed to the longest
+        # matching INSTALLED_APPS prefix or to its top-level package.
+        per_app = defaultdict(int)
+        per_package = defaultdict(int)
+        total = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, module = line[len('import time:'):].split('|')
+            self_us = int(self_us)
+            module = module.strip()
+            total += self_us
+
+            app = max(
+                (app for app in installed_apps if module == app or module.startswith(app + '.')),
+                key=len, default=None,
+            )
+            if app is not None:
+                per_app[app] += self_us
+            else:
+                per_package[module.split('.')[0]] += self_us
+
+        self.stdout.write(self.style.MIGRATE_HEADING(settings_module))
+        self.stdout.write(f"  django.setup():       {timings['setup'] * 1000:8.1f} ms")
+        if timings['first_request'] is not None:
+            self.stdout.write(f"  time to first request:{timings['first_request'] * 1000:8.1f} ms ({url})")
+        self.stdout.write(f"  total import time:    {total / 1000:8.1f} ms")
+
+        self.stdout.write("  INSTALLED_APPS (self import time):")
+        for app in installed_apps:
+            self.stdout.write(f"    {app:<45}{per_app[app] / 1000:8.1f} ms")
+
+        self.stdout.write("  other top-level packages:")
+        for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"    {package:<45}{self_us / 1000:8.1f} ms")
+
+    def get_installed_apps(self, settings_module):
+        """
+        Reads INSTALLED_APPS of another settings module without switching
+        the settings of the current process.
+        """
+        result = subprocess.run(
+            [
+                sys.executable, '-c',
+                'import importlib, json, sys; '
+                'print(json.dumps(importlib.import_module(sys.argv[1]).INSTALLED_APPS))',
+                settings_module,
+            ],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout)
@@ -0,0 +1,67 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ....blog.models import BlogPost, Comment
+from ....users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the database with users, posts and comments for load testing. "
+        "Users are named <prefix><n> and all share the same password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--prefix', default='loadtest')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        rng = random.Random(0)
+
+        # One hash for everyone: hashing each password would take minutes.
+        password = make_password(options['password'])
+        existing = set(
+            User.objects.filter(username__startswith=prefix).values_list('username', flat=True)
+        )
+        User.objects.bulk_create(
+            (
+                User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+                for i in range(options['users'])
+                if f'{prefix}{i}' not in existing
+            ),
+            batch_size=batch_size,
+        )
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+
+        content = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+        BlogPost.objects.bulk_create(
+            (
+                BlogPost(author_id=rng.choice(user_ids), title=f'Post {i}', content=content, is_published=True)
+                for i in range(options['posts'])
+            ),
+            batch_size=batch_size,
+        )
+        post_ids = list(BlogPost.objects.values_list('id', flat=True))
+
+        Comment.objects.bulk_create(
+            (
+                Comment(post_id=rng.choice(post_ids), author_id=rng.choice(user_ids), content=f'Comment {i}')
+                for i in range(options['comments'])
+            ),
+            batch_size=batch_size,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} users ({prefix}*), {options['posts']} posts "
+            f"and {options['comments']} comments."
+        ))
@@ -0,0 +1,137 @@
+import contextlib
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .queries import QueryBudgetExceeded, QueryMonitor, get_query_budget
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses responses with brotli when the client accepts it (and the
+    `brotli` package is installed), gzip otherwise.
+
+    Responses smaller than `COMPRESSION_MIN_SIZE` bytes are sent as is, since
+    the CPU spent on them buys almost nothing on the wire. Streaming responses
+    are never compressed so that event streams are flushed chunk by chunk.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or not re_accepts_br.search(ae):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(
+            response.content,
+            quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4),
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of each request and compares them with the budget
+    declared by the view (see `apps.api.queries.query_budget`), and logs
+    slow queries. The budget check is enabled with `QUERY_BUDGET_ENABLED`;
+    with `QUERY_BUDGET_RAISE` an exceeded budget raises `QueryBudgetExceeded`,
+    which fails the test using the test client, otherwise it is logged. The
+    slow query log is enabled with `SLOW_QUERY_LOG_ENABLED`.
+
+    Works in both the sync and the async request path, so that under ASGI
+    async views such as the comment stream are not adapted to sync for it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_enabled():
+            return self.get_response(request)
+
+        monitor = QueryMonitor()
+        with self.monitor_queries(monitor):
+            response = self.get_response(request)
+        self.check_budget(request, monitor)
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_enabled():
+            return await self.get_response(request)
+
+        # Connections are per thread: the wrappers go on the connections of
+        # the thread running the request's sync code, which every
+        # thread-sensitive `sync_to_async` call of the request shares.
+        monitor = QueryMonitor()
+        stack = contextlib.ExitStack()
+        await sync_to_async(stack.enter_context)(self.monitor_queries(monitor))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.check_budget(request, monitor)
+        return response
+
+    @staticmethod
+    def is_enabled():
+        return settings.QUERY_BUDGET_ENABLED or settings.SLOW_QUERY_LOG_ENABLED
+
+    @staticmethod
+    @contextlib.contextmanager
+    def monitor_queries(monitor):
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(monitor))
+            yield
+
+    @staticmethod
+    def check_budget(request, monitor):
+        budget = getattr(request, '_query_budget', None)
+        if not settings.QUERY_BUDGET_ENABLED or budget is None or len(monitor.queries) <= budget:
+            return
+        message = (
+            f"{request.method} {request.path} ran {len(monitor.queries)} queries, "
+            f"over its budget of {budget}:\n" + "\n".join(monitor.queries)
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func, request)
@@ -0,0 +1,43 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    A stored response for a write request sent with an `Idempotency-Key`
+    header, so a retried request can be answered without running it again.
+
+    Fields:
+        scope (CharField): Who the key belongs to, `user:<id>` or `anonymous[:<hash>]`.
+        key (CharField): The value of the `Idempotency-Key` header.
+        request_path (CharField): The path the key was first used on.
+        fingerprint (CharField): Hash of the method, path and body of the request.
+        status_code (PositiveSmallIntegerField): Status of the stored response,
+            empty while the first request is still being processed.
+        response_body (JSONField): Body of the stored response.
+        created_at (DateTimeField): When the request holding the key started.
+        expires_at (DateTimeField): The key is ignored and purged after this time.
+
+    Meta:
+        A unique index on (`scope`, `key`) backs the lookup and makes sure only
+        one of two concurrent requests with the same key gets processed.
+    """
+
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    request_path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Idempotency Key"
+        verbose_name_plural = "Idempotency Keys"
+        constraints = [
+            models.UniqueConstraint(fields=('scope', 'key'), name='unique_idempotency_key_per_scope'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} ({self.scope})"
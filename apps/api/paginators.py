@@ -0,0 +1,59 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids a full `COUNT(*)` on large tables.
+
+    When the queryset is not filtered beyond its model's default manager and
+    the database is PostgreSQL, the row count comes from the planner
+    statistics in `pg_class.reltuples`. Those count every row of the table:
+    if the default manager hides some of them, it must say which with a
+    `get_hidden_queryset()` method, whose (small) count is subtracted.
+    Tables estimated below `estimate_threshold` rows, filtered querysets,
+    managers hiding rows without saying which and other databases get an
+    exact count.
+    """
+
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimated_count()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count
+
+    def get_estimated_count(self):
+        queryset = self.object_list
+        model = getattr(queryset, 'model', None)
+        if model is None or connections[queryset.db].vendor != 'postgresql':
+            return None
+
+        hidden = None
+        manager = model._default_manager
+        if queryset.query.where != model._base_manager.all().query.where:
+            if queryset.query.where != manager.all().query.where:
+                return None
+            if not hasattr(manager, 'get_hidden_queryset'):
+                return None
+            hidden = manager.get_hidden_queryset().using(queryset.db)
+
+        estimate = self.get_table_estimate(model, queryset.db)
+        if estimate is None or estimate < self.estimate_threshold:
+            return estimate
+        if hidden is not None:
+            estimate = max(estimate - hidden.count(), 0)
+        return estimate
+
+    @staticmethod
+    def get_table_estimate(model, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
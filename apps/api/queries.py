@@ -0,0 +1,109 @@
+import logging
+import time
+import traceback
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request runs more queries than its view declares.
+    """
+
+
+def query_budget(budget):
+    """
+    Declares the maximum number of queries a view may run per request.
+
+    `budget` is either an int or a dict mapping actions (`list`, `retrieve`,
+    `create`...) or lowercase HTTP methods to an int. Works on function views
+    and view classes; on classes it is the same as setting the `query_budget`
+    attribute.
+    """
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+
+    return decorator
+
+
+def get_query_budget(view_func, request):
+    """
+    Returns the budget declared for the view handling `request`, or None.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class or view_func, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        method = request.method.lower()
+        budget = budget.get(actions.get(method, method))
+    return budget
+
+
+class QueryMonitor:
+    """
+    Database execute wrapper counting the queries of a request and, with
+    `SLOW_QUERY_LOG_ENABLED`, logging the ones slower than
+    `SLOW_QUERY_THRESHOLD_MS`, with the line of project code that ran them
+    and, if `SLOW_QUERY_EXPLAIN` is set, their plan.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.threshold = None
+        if settings.SLOW_QUERY_LOG_ENABLED:
+            self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.explain = settings.SLOW_QUERY_EXPLAIN
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append(sql)
+            if self.threshold is not None and duration >= self.threshold:
+                self.log_slow_query(sql, params, many, duration, context['connection'])
+
+    def log_slow_query(self, sql, params, many, duration, connection):
+        plan = None
+        if self.explain and not many and sql.lstrip().upper().startswith('SELECT'):
+            plan = self.get_plan(sql, params, connection)
+        logger.warning(
+            "Slow query (%.1f ms) from %s\n%s%s",
+            duration * 1000, self.get_origin(), sql,
+            f"\n{plan}" if plan else '',
+        )
+
+    @staticmethod
+    def get_origin():
+        """
+        Returns `file:line in function` of the innermost project frame,
+        skipping Django, DRF and this module.
+        """
+        base_dir = str(settings.BASE_DIR)
+        for frame in reversed(traceback.extract_stack()):
+            if (
+                frame.filename.startswith(base_dir)
+                and 'site-packages' not in frame.filename
+                and frame.filename != __file__
+            ):
+                return f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+        return "unknown"
+
+    @staticmethod
+    def get_plan(sql, params, connection):
+        # A raw cursor, so that neither this wrapper nor the pending result
+        # set of the original query are affected.
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except Exception as exc:
+            return f"EXPLAIN failed: {exc}"
+        finally:
+            cursor.close()
@@ -0,0 +1,96 @@
+import math
+
+import msgpack
+import orjson
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer, BaseRenderer
+
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """
+    Fallback for types the fast encoders don't handle natively (lazy strings,
+    Decimal, UUID, querysets...). Delegates to DRF's own JSON encoder so the
+    output matches what `JSONRenderer` would produce.
+    """
+    return _encoder.default(obj)
+
+
+_SCALAR_TYPES = frozenset((str, int, bool, type(None)))
+
+
+def _has_non_finite_float(data):
+    """
+    Whether `data` contains NaN or infinity, which orjson writes as null.
+    Only containers and floats are visited.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if type(item) is float:
+            if not math.isfinite(item):
+                return True
+            continue
+        if isinstance(item, dict):
+            values = item.values()
+        elif isinstance(item, (list, tuple)):
+            values = item
+        else:
+            continue
+        if not _SCALAR_TYPES.issuperset(map(type, values)):
+            stack.extend([value for value in values if type(value) not in _SCALAR_TYPES])
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's `JSONRenderer` backed by orjson.
+    Pretty-printed output (`; indent=N`, the browsable API) and data orjson
+    can't encode the same way (integers over 64 bits, NaN and infinity)
+    still go through the stdlib encoder.
+    """
+
+    # Datetimes are left to DRF's encoder, which renders UTC as `Z`.
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # orjson writes NaN and infinity as null, `JSONRenderer` rejects them
+        # (or writes them as is, when not strict).
+        if b'null' in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, same as `JSONRenderer`.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the response as MessagePack, selected with
+    `Accept: application/msgpack`.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
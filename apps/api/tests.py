@@ -1,3 +1,375 @@
-from django.test import TestCase
+import datetime
+import gzip
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .idempotency import get_fingerprint
+from .middleware import QueryBudgetMiddleware, brotli
+from .models import IdempotencyKey
+from .queries import QueryBudgetExceeded
+from .renderers import ORJSONRenderer
+from .views import BlogPostViewSet, CommentViewSet, comment_stream
+from ..blog.models import BlogPost, Comment, PostScore
+from ..blog.realtime import comment_broker
+from ..users.models import User
+from ..users.serializers import CustomTokenObtainPairSerializer
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    """
+    Requests through the test client fail with `QueryBudgetExceeded` when a
+    view runs more queries than its `query_budget`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        for i in range(15):
+            author = User.objects.create_user(f'user{i}', f'user{i}@example.com')
+            post = BlogPost.objects.create(author=author, title=f'Post {i}', content='Lorem ipsum dolor sit amet ' * 3)
+            Comment.objects.create(post=post, author=author, content=f'Comment {i}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.authorization = f'Bearer {CustomTokenObtainPairSerializer.get_token(self.user).access_token}'
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+        self.post = BlogPost.objects.first()
+
+    def test_reads_within_budget(self):
+        self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.id}/').status_code, 200)
+        self.assertEqual(self.client.get('/api/comments/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/profile/{self.user.id}/').status_code, 200)
+
+    def test_writes_within_budget(self):
+        response = self.client.post(
+            '/api/posts/', {'title': 'New post', 'content': 'Lorem ipsum dolor sit amet ' * 3},
+            format='json', HTTP_IDEMPOTENCY_KEY='new-post',
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(
+            '/api/comments/', {'post': self.post.id, 'content': 'Nice post'},
+            format='json', HTTP_IDEMPOTENCY_KEY='new-comment',
+        )
+        self.assertEqual(response.status_code, 201)
+        comment_id = Comment.objects.latest('id').id
+        self.assertEqual(self.client.patch(f'/api/comments/{comment_id}/', {'content': 'Edited'}, format='json').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/comments/{comment_id}/').status_code, 204)
+        self.assertEqual(self.client.patch(f'/api/profile/{self.user.id}/', {'email': 'a@example.com'}, format='json').status_code, 200)
+
+    def test_first_comment_within_budget(self):
+        # The costliest comment: the first on its post, with a key, and the
+        # user's token version not cached yet.
+        post = BlogPost.objects.create(author=self.user, title='Quiet post', content='Lorem ipsum dolor sit amet ' * 3)
+        cache.clear()
+        response = self.client.post(
+            '/api/comments/', {'post': post.id, 'content': 'First!'},
+            format='json', HTTP_IDEMPOTENCY_KEY='first-comment',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(PostScore.objects.filter(post=post).exists())
+
+    def test_exceeded_budget_fails_the_request(self):
+        with mock.patch.object(BlogPostViewSet, 'query_budget', {'list': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'over its budget of 1'):
+                self.client.get('/api/posts/')
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=True)
+    def test_slow_queries_are_logged_with_origin_and_plan(self):
+        with self.assertLogs('apps.api.queries', 'WARNING') as logs:
+            self.client.get(f'/api/posts/{self.post.id}/')
+        self.assertIn('Slow query', logs.output[0])
+        self.assertIn('apps/', logs.output[0])
+        self.assertIn('blog_blogpost', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_ENABLED=False, SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_log_has_its_own_switch(self):
+        with mock.patch.object(BlogPostViewSet, 'query_budget', {'retrieve': 1}):
+            with self.assertLogs('apps.api.queries', 'WARNING'):
+                self.client.get(f'/api/posts/{self.post.id}/')
+            with self.settings(SLOW_QUERY_LOG_ENABLED=False), self.assertNoLogs('apps.api.queries'):
+                self.client.get(f'/api/posts/{self.post.id}/')
+
+    async def test_async_views_are_counted(self):
+        # The queries run through sync_to_async by the async view are seen.
+        with mock.patch.object(comment_stream, 'query_budget', 0):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'over its budget of 0'):
+                await AsyncClient().get('/api/posts/0/comments/stream/', headers={'Authorization': self.authorization})
+
+    def test_middleware_is_async_capable(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(QueryBudgetMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(QueryBudgetMiddleware(lambda request: None)))
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    `ORJSONRenderer` must produce the same bytes as `JSONRenderer`.
+    """
+
+    def assertSameOutput(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_datetimes(self):
+        self.assertSameOutput({
+            'utc': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'naive': datetime.datetime(2024, 5, 1, 12, 30),
+            'date': datetime.date(2024, 5, 1),
+        })
+
+    def test_non_string_keys(self):
+        self.assertSameOutput({0: ['This field is required.'], 1: {'name': ['Invalid.']}})
+
+    def test_big_integers(self):
+        self.assertSameOutput({'id': 2 ** 70, 'items': [-(2 ** 64)]})
+
+    def test_line_separators(self):
+        self.assertSameOutput({'title': 'a\u2028b\u2029c'})
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({'results': [{'score': value}], 'next': None})
+
+
+class ContentNegotiationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        for i in range(10):
+            BlogPost.objects.create(author=cls.user, title=f'Post {i}', content='Lorem ipsum dolor sit amet ' * 10)
+
+    def test_msgpack_response(self):
+        response = self.client.get('/api/posts/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['count'], 10)
+        self.assertEqual(data['results'], self.client.get('/api/posts/').json()['results'])
+
+    def test_msgpack_request_body(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            '/api/posts/',
+            msgpack.packb({'title': 'Packed', 'content': 'Lorem ipsum dolor sit amet ' * 3}),
+            content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(BlogPost.objects.filter(title='Packed', author=self.user).exists())
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get('/api/posts/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_MIN_SIZE=100)
+    def test_large_responses_are_compressed(self):
+        expected = self.client.get('/api/posts/').content
+
+        response = self.client.get('/api/posts/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), expected)
+
+        if brotli is not None:
+            response = self.client.get('/api/posts/', HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.content), expected)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class ListSerializationTests(TestCase):
+    """
+    The lists built from `values_list()` rows by the read serializers are
+    byte for byte the responses of `BlogPostSerializer`/`CommentSerializer`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        authors = [cls.user, User.objects.create_user('bob', 'bob@example.com')]
+        for i in range(12):
+            post = BlogPost.objects.create(
+                author=authors[i % 2], title=f'Post {i} \u00e9t\u00e9', content='Lorem ipsum dolor sit amet \u2028' * 3,
+                is_published=i % 3 == 0,
+            )
+            Comment.objects.create(post=post, author=authors[(i + 1) % 2], content=f'Comment "{i}" \U0001f600')
+        # Microseconds, and a datetime without them which isoformat() shortens.
+        BlogPost.objects.filter(pk=post.pk).update(created_at=datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc))
+        Comment.objects.filter(post=post).update(updated_at=datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSameAsModelSerializer(self, viewset, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(viewset, 'read_serializer_class', None):
+            expected = self.client.get(url)
+        self.assertEqual(response.content, expected.content)
+
+    def test_post_list(self):
+        self.assertSameAsModelSerializer(BlogPostViewSet, '/api/posts/')
+        self.assertSameAsModelSerializer(BlogPostViewSet, '/api/posts/?page=2')
+
+    def test_comment_list(self):
+        self.assertSameAsModelSerializer(CommentViewSet, '/api/comments/')
+        self.assertSameAsModelSerializer(CommentViewSet, '/api/comments/?page=2')
+
+    @override_settings(TIME_ZONE='Europe/Paris')
+    def test_post_list_in_another_time_zone(self):
+        self.assertSameAsModelSerializer(BlogPostViewSet, '/api/posts/')
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        cls.post_data = {'title': 'New post', 'content': 'Lorem ipsum dolor sit amet ' * 3}
+
+    def setUp(self):
+        self.client = APIClient()
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def create_post(self, data=None, key='key-1', path='/api/posts/'):
+        return self.client.post(path, data or self.post_data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_gets_the_stored_response(self):
+        first = self.create_post()
+        self.assertEqual(first.status_code, 201)
+        retry = self.create_post()
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(BlogPost.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.assertEqual(self.create_post().status_code, 201)
+        other_body = self.create_post({'title': 'Other post', 'content': self.post_data['content']})
+        self.assertEqual(other_body.status_code, 422)
+        other_path = self.create_post({'post': BlogPost.objects.get().id, 'content': 'Hi'}, path='/api/comments/')
+        self.assertEqual(other_path.status_code, 422)
+        self.assertEqual(BlogPost.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_request_in_progress(self):
+        self.create_pending_key()
+        self.assertEqual(self.create_post().status_code, 409)
+        self.assertFalse(BlogPost.objects.exists())
+
+    def test_abandoned_request_is_taken_over(self):
+        record = self.create_pending_key()
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - settings.IDEMPOTENCY_KEY_LEASE,
+        )
+        self.assertEqual(self.create_post().status_code, 201)
+        record.refresh_from_db()
+        self.assertEqual(record.status_code, 201)
+        self.assertEqual(BlogPost.objects.count(), 1)
+
+    def test_failed_requests_release_the_key(self):
+        self.assertEqual(self.create_post({'title': 'x'}).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        with mock.patch.object(BlogPostViewSet, 'perform_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_post()
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self.create_post().status_code, 201)
+
+    def test_anonymous_registrations_are_scoped_by_email(self):
+        client = APIClient()
+        bob = client.post(
+            '/api/auth/register/', {'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'},
+            format='json', HTTP_IDEMPOTENCY_KEY='1',
+        )
+        carol = client.post(
+            '/api/auth/register/', {'username': 'carol', 'email': 'carol@example.com', 'password': 'secret'},
+            format='json', HTTP_IDEMPOTENCY_KEY='1',
+        )
+        self.assertEqual((bob.status_code, carol.status_code), (201, 201))
+        self.assertNotEqual(bob.json()['user_id'], carol.json()['user_id'])
+        self.assertTrue(User.objects.filter(username='carol').exists())
+
+        other_body = client.post(
+            '/api/auth/register/', {'username': 'bobby', 'email': 'BOB@example.com', 'password': 'secret'},
+            format='json', HTTP_IDEMPOTENCY_KEY='1',
+        )
+        self.assertEqual(other_body.status_code, 422)
+
+    def create_pending_key(self):
+        """
+        The row left by a request with `key-1` that is running, or whose
+        worker died before storing the response.
+        """
+        request = APIRequestFactory().post('/api/posts/', self.post_data, format='json')
+        return IdempotencyKey.objects.create(
+            scope=f'user:{self.user.pk}', key='key-1', request_path='/api/posts/',
+            fingerprint=get_fingerprint(request), expires_at=timezone.now() + settings.IDEMPOTENCY_KEY_TTL,
+        )
+
+
+class CommentStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        cls.post = BlogPost.objects.create(author=cls.user, title='Post', content='Lorem ipsum dolor sit amet ' * 3)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.user, content=f'Comment {i}')
+            for i in range(3)
+        ]
+        cls.url = f'/api/posts/{cls.post.id}/comments/stream/'
+        cls.token = str(CustomTokenObtainPairSerializer.get_token(cls.user).access_token)
+
+    def test_refused_under_wsgi(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 501)
+
+    async def test_missed_comments_are_replayed_then_new_ones_streamed(self):
+        response = await AsyncClient().get(self.url, headers={
+            'Authorization': f'Bearer {self.token}',
+            'Last-Event-ID': str(self.comments[0].id),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        try:
+            for comment in self.comments[1:]:
+                self.assertTrue((await anext(events)).startswith(f'id: {comment.id}\nevent: comment\n'.encode()))
+
+            # Already sent during the replay, then a new one.
+            comment_broker.publish({'id': self.comments[2].id, 'post': self.post.id})
+            comment_broker.publish({'id': self.comments[2].id + 1, 'post': self.post.id})
+            self.assertTrue((await anext(events)).startswith(f'id: {self.comments[2].id + 1}\n'.encode()))
+        finally:
+            await events.aclose()
+
+    @override_settings(COMMENT_STREAM_QUEUE_SIZE=1)
+    async def test_long_replay_ends_with_overflow(self):
+        response = await AsyncClient().get(self.url, headers={
+            'Authorization': f'Bearer {self.token}',
+            'Last-Event-ID': str(self.comments[0].id),
+        })
+        events = [event async for event in response.streaming_content]
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[0].startswith(f'id: {self.comments[1].id}\n'.encode()))
+        self.assertTrue(events[1].startswith(b'event: overflow\n'))
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
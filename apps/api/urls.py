@@ -10,8 +10,10 @@ router.register(r'posts', views.BlogPostViewSet)
 router.register(r'comments', views.CommentViewSet)
 
 urlpatterns = [
+    path('posts/<int:pk>/comments/stream/', views.comment_stream, name='comment_stream'),
     path('profile/<int:id>/', views.ProfileView.as_view(), name='profile'),
     path('auth/register/', views.RegisterView.as_view(), name='register'),
+    path('users/provision/', views.BulkProvisionView.as_view(), name='users_provision'),
     path('auth/login/', views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair_login'),
     path('auth/logout/', views.CustomLogoutView.as_view(), name='token_blacklist_logout'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -1,4 +1,13 @@
-from rest_framework.exceptions import PermissionDenied
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
@@ -9,13 +18,22 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenBlacklistView
 
 from ..blog.models import BlogPost, Comment
+from ..blog.realtime import comment_broker, OVERFLOW
 from ..blog.serializers import (
-    BlogPostSerializer, BlogPostInputSerializer,
-    CommentSerializer, CommentInputSerializer,
+    BlogPostSerializer, BlogPostInputSerializer, BlogPostReadSerializer,
+    CommentSerializer, CommentInputSerializer, CommentReadSerializer,
 )
+from ..blog.trending import get_trending
+from ..users.authentication import ClaimsJWTAuthentication
 from ..users.models import User
 from ..users.serializers import RegisterSerializer, ProfileSerializer, CustomTokenObtainPairSerializer
-from ..users.permissions import IsProfileOwnerOrAdmin
+from ..users.permissions import IsProfileOwnerOrAdmin, IsAdminRole
+from ..users.provisioning import provision_users
+from .idempotency import anonymous_scope, idempotent
+from .queries import query_budget
+
+
+logger = logging.getLogger(__name__)
 
 
 class BaseViewSet(ModelViewSet):
@@ -28,6 +46,7 @@ class BaseViewSet(ModelViewSet):
 
     serializer_class = None
     input_serializer_class = None
+    read_serializer_class = None
     is_comment: bool = False
 
     def get_serializer_class(self):
@@ -39,51 +58,91 @@ class BaseViewSet(ModelViewSet):
             return self.input_serializer_class
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """
+        Lists objects through `read_serializer_class` when one is set,
+        building the page straight from `values_list()` rows.
+        """
+        if self.read_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.read_serializer_class.get_rows(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.read_serializer_class(page).data)
+        return Response(self.read_serializer_class(rows).data)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """
+        Creates the instance. Retries sent with the same `Idempotency-Key`
+        get the stored response instead of creating a duplicate.
+        """
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """
         Saves the instance, setting the current user as the author.
+        The id is used so the user doesn't have to be loaded.
         """
-        serializer.save(author=self.request.user)
+        serializer.save(author_id=self.request.user.id)
 
     def perform_update(self, serializer):
         """
         Updates the instance after verifying the user's permission to edit it.
         Raises PermissionDenied if the user lacks permission.
         """
-        comment = self.get_object()
-        if not self._my_permission(comment):
+        if not self._my_permission(serializer.instance):
             raise PermissionDenied("You don't have permission to edit this object.")
         serializer.save()
 
     def perform_destroy(self, instance):
         """
-        Deletes the instance after verifying the user's permission to delete it.
+        Soft-deletes the instance after verifying the user's permission to delete it.
         Raises PermissionDenied if the user lacks permission.
         """
         if not self._my_permission(instance):
             raise PermissionDenied("You don't have permission to delete this object.")
-        super().perform_destroy(instance)
+        instance.soft_delete()
 
     def _my_permission(self, obj):
         """
         Checks if the current user has permission to perform the action on the given object.
         Permissions differ based on whether the object is a comment or not.
         """
+        user_id = self.request.user.id
         if self.is_comment:
             return (
-                    self.request.user == obj.author or
+                    user_id == obj.author_id or
                     self.request.user.role == 'admin' or
-                    self.request.user == obj.post.author
+                    user_id == obj.post.author_id
             )
         else:
-            return self.request.user == obj.author or self.request.user.role == 'admin'
+            return user_id == obj.author_id or self.request.user.role == 'admin'
 
 
 class BlogPostViewSet(BaseViewSet):
-    queryset = BlogPost.objects.all()
+    # Newest first, which the list reads from the `blogpost_live_created_idx` partial index.
+    queryset = BlogPost.objects.select_related('author').order_by('-created_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = BlogPostSerializer
     input_serializer_class = BlogPostInputSerializer
+    read_serializer_class = BlogPostReadSerializer
+    query_budget = {
+        'list': 3, 'retrieve': 2, 'trending': 2,
+        'create': 7, 'update': 3, 'partial_update': 3, 'destroy': 6,
+    }
+
+    @action(detail=False)
+    def trending(self, request):
+        """
+        Posts with the most comments, recent comments weighing more. The
+        list is served from the cache and refreshed every
+        TRENDING_CACHE_TIMEOUT seconds.
+        """
+        return Response(get_trending())
 
 
 class CommentViewSet(BaseViewSet):
@@ -91,12 +150,29 @@ class CommentViewSet(BaseViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CommentSerializer
     input_serializer_class = CommentInputSerializer
+    read_serializer_class = CommentReadSerializer
     is_comment = True
+    # A create with an Idempotency-Key and an uncached token version runs 9
+    # queries, plus the pg_notify of the comment stream on PostgreSQL.
+    query_budget = {
+        'list': 3, 'retrieve': 2,
+        'create': 10, 'update': 5, 'partial_update': 5, 'destroy': 4,
+    }
 
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    query_budget = 6
+
+    def get_idempotency_scope(self, request):
+        """
+        Registration is anonymous: keys are scoped by the email being
+        registered, so two people picking the same key stay apart.
+        """
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return anonymous_scope(email) if isinstance(email, str) and email else 'anonymous'
 
+    @idempotent
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
@@ -108,6 +184,62 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkProvisionView(APIView):
+    """
+    Creates many users in one request. Admin only.
+
+    The body is a list of `{"username", "email", "password", "role"}` objects.
+    The response streams one JSON line per row, as each batch is inserted,
+    under WSGI and ASGI alike.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminRole]
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': "Expected a list of users."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = self.stream_results(request.data)
+        if isinstance(request._request, ASGIRequest):
+            # Django reads a sync iterator to the end before sending it
+            # under ASGI; each line is produced in the request's thread.
+            results = _iterate_in_thread(results)
+        return StreamingHttpResponse(results, content_type='application/x-ndjson')
+
+    @staticmethod
+    def stream_results(rows):
+        """
+        One JSON line per result. The status is already sent, so an error
+        halfway through ends the stream with a `{"status": "error"}` line;
+        the rows reported as created before it are in the database.
+        """
+        try:
+            for result in provision_users(rows):
+                yield json.dumps(result) + '\n'
+        except Exception:
+            logger.exception("User provisioning failed")
+            yield json.dumps({
+                'status': 'error',
+                'detail': "Provisioning failed, the rows not reported above were not created.",
+            }) + '\n'
+
+
+async def _iterate_in_thread(iterator):
+    """
+    Async iterator over a sync one, each item computed through
+    thread-sensitive `sync_to_async`, so that the database connection used
+    stays the same.
+    """
+    done = object()
+    try:
+        while (item := await sync_to_async(next)(iterator, done)) is not done:
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
     serializer_class = CustomTokenObtainPairSerializer
@@ -126,6 +258,7 @@ class ProfileView(RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = ProfileSerializer
     lookup_field = 'id'
+    query_budget = {'get': 2, 'put': 5, 'patch': 5}
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -137,3 +270,89 @@ class ProfileView(RetrieveUpdateAPIView):
     def is_profile_owner_or_admin(self, request, view):
         profile = self.get_object()
         return profile.user == request.user or self.request.user.role == 'admin'
+
+
+@query_budget(3)
+async def comment_stream(request, pk):
+    """
+    Server-Sent Events stream of the new comments of a post.
+
+    Each comment is sent as an event whose id is the comment id, with the
+    same JSON body as `/api/comments/`. A client reconnecting with
+    `Last-Event-ID` first gets the comments it missed. A client too slow to
+    drain its queue, or with more than `COMMENT_STREAM_QUEUE_SIZE` comments
+    to catch up on, receives an `overflow` event and is disconnected; it
+    then reconnects the same way.
+
+    Requires an ASGI server. Under WSGI the endless stream would be buffered
+    by Django and hold a worker forever, so the request is refused with 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'detail': "The comment stream needs the ASGI application (config.asgi)."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    try:
+        auth = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if auth is None:
+        return JsonResponse(
+            {'detail': "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    if not await BlogPost.objects.filter(pk=pk).aexists():
+        return JsonResponse({'detail': "No BlogPost matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_id = 0
+
+    def format_event(comment):
+        return f"id: {comment['id']}\nevent: comment\ndata: {json.dumps(comment)}\n\n"
+
+    async def events():
+        nonlocal last_id
+        # Subscribe before reading the backlog so nothing committed in
+        # between is missed; duplicates are skipped by id.
+        subscription = comment_broker.subscribe(pk)
+        try:
+            if last_id:
+                # At most a queue's worth of comments, like a live client. A
+                # longer backlog ends with `overflow` and the client catches
+                # up over several reconnects.
+                limit = settings.COMMENT_STREAM_QUEUE_SIZE
+                rows = [
+                    row async for row in CommentReadSerializer.get_rows(
+                        Comment.objects.filter(post_id=pk, id__gt=last_id).order_by('id')
+                    )[:limit + 1]
+                ]
+                for comment in CommentReadSerializer(rows[:limit]).data:
+                    last_id = comment['id']
+                    yield format_event(comment)
+                if len(rows) > limit:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+
+            while True:
+                try:
+                    comment = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.COMMENT_STREAM_HEARTBEAT,
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if comment is OVERFLOW:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                if comment['id'] > last_id:
+                    last_id = comment['id']
+                    yield format_event(comment)
+        finally:
+            comment_broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
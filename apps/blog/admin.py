@@ -1,20 +1,42 @@
 from django.contrib import admin
 from django.utils import timezone
+from .filters import AutocompleteFilter, AutocompleteFilterMixin
 from .models import BlogPost, Comment
+from ..api.paginators import EstimatedCountPaginator
 
 
-class BlogPostAdmin(admin.ModelAdmin):
+class AuthorFilter(AutocompleteFilter):
+    title = 'author'
+    field_name = 'author'
+
+
+class PostFilter(AutocompleteFilter):
+    title = 'post'
+    field_name = 'post'
+
+
+class BlogPostAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'created_at', 'updated_at', 'is_published')
-    list_filter = ('is_published', 'author')
+    list_filter = ('is_published', AuthorFilter)
+    list_select_related = ('author',)
     search_fields = ('title', 'content', 'author__username')
     ordering = ('-created_at',)
     list_editable = ('is_published',)
     date_hierarchy = 'created_at'
+    autocomplete_fields = ('author',)
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     exclude = ('created_at', 'updated_at')
 
     actions = ['publish_selected', 'unpublish_selected']
 
+    def get_queryset(self, request):
+        # The autocomplete view doesn't use list_select_related, and
+        # BlogPost.__str__ reads the author.
+        return super().get_queryset(request).select_related('author')
+
     def publish_selected(self, request, queryset):
         queryset.update(is_published=True)
     publish_selected.short_description = "Publish selected entries"
@@ -23,12 +45,31 @@ class BlogPostAdmin(admin.ModelAdmin):
         queryset.update(is_published=False)
     unpublish_selected.short_description = "Unpublish selected entries"
 
+    # Deleting from the admin is soft, like through the API: the rows are
+    # removed later by `purge_deleted`, not by a cascade in the request.
+    def delete_model(self, request, obj):
+        obj.soft_delete()
 
-class CommentAdmin(admin.ModelAdmin):
+    def delete_queryset(self, request, queryset):
+        queryset.soft_delete()
+
+
+class CommentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('author', 'post', 'content', 'created_at', 'updated_at')
-    list_filter = ('post', 'author')
+    list_filter = (PostFilter, AuthorFilter)
+    list_select_related = ('author', 'post__author')
     search_fields = ('content', 'author__username', 'post__title')
     ordering = ('-created_at',)
+    autocomplete_fields = ('post', 'author')
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        queryset.soft_delete()
 
     def save_model(self, request, obj, form, change):
         if not obj.id:
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...models import Comment, CommentArchive
+
+
+class Command(BaseCommand):
+    help = "Move comments older than --older-than days from Comment into CommentArchive, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=365, help="Age in days of the comment.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        queryset = Comment.objects.filter(created_at__lt=cutoff).order_by('id')
+
+        archived = 0
+        while True:
+            # Each batch is copied and deleted in its own transaction, so an
+            # interrupted run leaves no comment both archived and live.
+            with transaction.atomic():
+                rows = list(queryset.values(
+                    'id', 'post_id', 'author_id', 'content', 'created_at', 'updated_at',
+                )[:options['batch_size']])
+                if not rows:
+                    break
+                CommentArchive.objects.bulk_create(
+                    [CommentArchive(**row) for row in rows],
+                    ignore_conflicts=True,
+                )
+                Comment.all_objects.filter(id__in=[row['id'] for row in rows]).delete()
+            archived += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} comments."))
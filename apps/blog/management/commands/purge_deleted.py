@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...models import BlogPost, Comment
+
+
+class Command(BaseCommand):
+    help = "Permanently delete posts and comments soft-deleted more than --older-than days ago, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, help="Age in days of the soft deletion.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        batch_size = options['batch_size']
+
+        # Comments first, so deleting a post never cascades into a large DELETE.
+        comments = self.purge(Comment.all_objects.filter(deleted_at__lte=cutoff), batch_size)
+        posts = 0
+        for ids in self.batches(BlogPost.all_objects.filter(deleted_at__lte=cutoff), batch_size):
+            comments += self.purge(Comment.all_objects.filter(post_id__in=ids), batch_size)
+            posts += BlogPost.all_objects.filter(id__in=ids).delete()[1].get(BlogPost._meta.label, 0)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {posts} posts and {comments} comments."))
+
+    def purge(self, queryset, batch_size):
+        deleted = 0
+        for ids in self.batches(queryset, batch_size):
+            deleted += queryset.model.all_objects.filter(id__in=ids).delete()[0]
+        return deleted
+
+    @staticmethod
+    def batches(queryset, batch_size):
+        """
+        Yields lists of ids until the queryset is empty. Each batch is
+        re-queried, since the previous one has been deleted.
+        """
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return
+            yield ids
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...trending import recompute_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the trending scores of posts from their comments. Run it periodically: it "
+        "drops deleted comments and the posts nobody commented on lately from the ranking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-lives', type=int, default=14,
+            help="Only count comments younger than this many TRENDING_HALF_LIFE.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - settings.TRENDING_HALF_LIFE * options['half_lives']
+        count = recompute_scores(since, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Scored {count} posts."))
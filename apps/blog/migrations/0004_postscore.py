@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_commentarchive_blogpost_deleted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='blog.blogpost')),
+                ('log_score', models.FloatField(verbose_name='Log score')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated datetime')),
+            ],
+            options={
+                'verbose_name': 'Post Score',
+                'verbose_name_plural': 'Post Scores',
+                'indexes': [models.Index(fields=['-log_score'], name='postscore_log_score_idx')],
+            },
+        ),
+    ]
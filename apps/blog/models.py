@@ -1,8 +1,48 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinLengthValidator
+from django.utils import timezone
 from ..users.models import User
 
 
+class SoftDeleteQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """
+        Marks all rows of the queryset as deleted with a single UPDATE.
+        """
+        return self.update(deleted_at=timezone.now())
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Default manager that hides soft-deleted rows. The filter matches the
+    partial indexes declared on the models, so live-row queries never scan
+    deleted rows. Use `all_objects` to include them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+    def get_hidden_queryset(self):
+        """
+        The soft-deleted rows, read from the `*_deleted_idx` partial indexes.
+        Used by `EstimatedCountPaginator` to correct the table estimate.
+        """
+        return models.QuerySet(self.model, using=self._db).filter(deleted_at__isnull=False)
+
+
+class BlogPostQuerySet(SoftDeleteQuerySet):
+    def soft_delete(self):
+        """
+        Marks the posts of the queryset and their comments as deleted, with
+        one UPDATE each, like `BlogPost.soft_delete`.
+        """
+        deleted_at = timezone.now()
+        with transaction.atomic(using=self.db):
+            # Comments first: once updated, the posts are out of the queryset.
+            Comment.objects.using(self.db).filter(post__in=self).update(deleted_at=deleted_at)
+            return self.update(deleted_at=deleted_at)
+
+
 class BlogPost(models.Model):
     """
     A model representing a blog post with title, content, author, and publication status.
@@ -14,10 +54,13 @@ class BlogPost(models.Model):
         created_at (DateTimeField): The timestamp when the blog post was created.
         updated_at (DateTimeField): The timestamp when the blog post was last updated.
         is_published (BooleanField): A flag indicating whether the blog post is published or not.
+        deleted_at (DateTimeField): When the post was soft-deleted, empty for live posts.
 
     Features:
         - The `title` and `content` fields are automatically formatted before saving.
         - The `is_published` field defaults to `False`.
+        - `objects` only returns live posts, `all_objects` includes soft-deleted ones.
+        - Deleting posts, one or a queryset, soft-deletes their comments too.
 
     Meta:
         verbose_name = "Blog Post"
@@ -38,6 +81,10 @@ class BlogPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created DateTime")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated DateTime")
     is_published = models.BooleanField(default=False, verbose_name="Published")
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Deleted DateTime")
+
+    objects = SoftDeleteManager.from_queryset(BlogPostQuerySet)()
+    all_objects = models.Manager()
 
     def save(self, *args, **kwargs):
         """
@@ -48,9 +95,31 @@ class BlogPost(models.Model):
 
         super().save(*args, **kwargs)
 
+    def soft_delete(self):
+        """
+        Marks the post and its comments as deleted with two UPDATEs instead
+        of a cascading DELETE. The rows are removed later by `purge_deleted`.
+        """
+        with transaction.atomic():
+            self.deleted_at = timezone.now()
+            BlogPost.all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+            self.comments.update(deleted_at=self.deleted_at)
+
     class Meta:
         verbose_name = "Blog Post"
         verbose_name_plural = "Blog Posts"
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='blogpost_live_created_idx',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='blogpost_deleted_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Post: {self.title} (author: {self.author.username}) (Published: {self.is_published})"
@@ -66,6 +135,7 @@ class Comment(models.Model):
         content (TextField): The content of the comment.
         created_at (DateTimeField): The timestamp when the comment was created.
         updated_at (DateTimeField): The timestamp when the comment was last updated.
+        deleted_at (DateTimeField): When the comment was soft-deleted, empty for live comments.
     """
 
     post = models.ForeignKey(
@@ -85,6 +155,24 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created datetime")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated datetime")
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Deleted datetime")
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-created_at'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='comment_live_post_idx',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='comment_deleted_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -94,5 +182,68 @@ class Comment(models.Model):
         self.content = self.content.strip().capitalize()
         super().save(*args, **kwargs)
 
+    def soft_delete(self):
+        """
+        Marks the comment as deleted. The row is removed later by `purge_deleted`.
+        """
+        self.deleted_at = timezone.now()
+        Comment.all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+
+    def __str__(self):
+        return f"Comment from {self.author.username} to post {self.post.title}"
+
+
+class CommentArchive(models.Model):
+    """
+    Old comments moved out of the `Comment` table by `archive_comments`,
+    which keeps the hot table small.
+
+    The row keeps the id of the original comment. `post_id` and `author_id`
+    are plain integers rather than foreign keys, so archived rows are never
+    part of a delete cascade.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    post_id = models.BigIntegerField(db_index=True)
+    author_id = models.BigIntegerField()
+    content = models.TextField(max_length=1000)
+    created_at = models.DateTimeField(verbose_name="Created datetime")
+    updated_at = models.DateTimeField(verbose_name="Updated datetime")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archived datetime")
+
+    class Meta:
+        verbose_name = "Archived Comment"
+        verbose_name_plural = "Archived Comments"
+
+    def __str__(self):
+        return f"Archived comment {self.id} to post {self.post_id}"
+
+
+class PostScore(models.Model):
+    """
+    Trending score of a post, maintained by `apps.blog.trending`.
+
+    Every comment adds `exp((created_at - epoch) / tau)` to the score of its
+    post. Ranking by that sum is ranking by comments decayed with time, since
+    decaying all of them to the current time divides every score by the same
+    factor. The sum grows without bound, so `log_score` stores its logarithm.
+    """
+
+    post = models.OneToOneField(
+        BlogPost,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    log_score = models.FloatField(verbose_name="Log score")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated datetime")
+
+    class Meta:
+        verbose_name = "Post Score"
+        verbose_name_plural = "Post Scores"
+        indexes = [
+            models.Index(fields=['-log_score'], name='postscore_log_score_idx'),
+        ]
+
     def __str__(self):
-        return f"Comment from {self.author.username} to post {self.post.title}"
\ No newline at end of file
+        return f"Score of post {self.post_id}"
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'blog_comments'
+
+# Put in a subscriber's queue when it fell too far behind.
+OVERFLOW = object()
+
+
+class Subscription:
+    """
+    One SSE client listening to the comments of a post. Events are handed
+    over to the event loop of the client's request through a bounded queue.
+    """
+
+    def __init__(self, post_id, max_size):
+        self.post_id = post_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def put(self, event):
+        """
+        Runs in the subscriber's event loop. A client that doesn't keep up
+        has its backlog dropped and gets `OVERFLOW`, which ends the stream;
+        it then reconnects with `Last-Event-ID` and catches up from the
+        database. Memory per client stays bounded either way.
+        """
+        if self.overflowed:
+            return
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class CommentBroker:
+    """
+    In-process fan-out of new comments to the SSE subscribers of a post.
+
+    On PostgreSQL, comments are published with NOTIFY inside the inserting
+    transaction. A single LISTEN connection per process receives them once
+    committed, whichever worker wrote them. On other databases, comments are
+    published locally once the transaction commits.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, post_id):
+        subscription = Subscription(post_id, settings.COMMENT_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[post_id].add(subscription)
+        if self.uses_notify():
+            self._start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.post_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.post_id]
+
+    def publish(self, event):
+        """
+        Hands `event` (a serialized comment) to every subscriber of its post.
+        Safe to call from any thread.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['post'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The client's event loop is already closed.
+                self.unsubscribe(subscription)
+
+    def notify(self, event, using=DEFAULT_DB_ALIAS):
+        """
+        Publishes `event` once the current transaction commits.
+        """
+        if self.uses_notify(using):
+            with connections[using].cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps(event)])
+        else:
+            transaction.on_commit(lambda: self.publish(event), using=using)
+
+    @staticmethod
+    def uses_notify(using=DEFAULT_DB_ALIAS):
+        return connections[using].vendor == 'postgresql'
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name='comment-listener', daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        """
+        Receives the NOTIFY payloads on a dedicated connection and publishes
+        them locally. Reconnects after a connection error.
+        """
+        while True:
+            connection = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                connection.ensure_connection()
+                raw = connection.connection
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                while True:
+                    if select.select([raw], [], [], 5) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self.publish(json.loads(raw.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Comment listener lost its database connection, reconnecting.")
+                time.sleep(1)
+            finally:
+                connection.close()
+
+
+comment_broker = CommentBroker()
@@ -1,4 +1,10 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings, ISO_8601
+
 from .models import BlogPost, Comment
 from ..users.models import User
 
@@ -40,3 +46,131 @@ class CommentInputSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('post', 'content')
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer that builds list responses straight from
+    `values_list()` rows, skipping the per-field `to_representation` dispatch
+    of `ModelSerializer`.
+
+    `fields` maps output keys to ORM lookups; a nested dict produces a nested
+    object. The lookups and the row-to-dict plan are compiled once per class,
+    and the datetime formatter is resolved once per page. The output is the
+    same as the matching `ModelSerializer` with DRF's default settings.
+
+    Usage:
+        rows = BlogPostReadSerializer.get_rows(queryset)
+        BlogPostReadSerializer(page_of_rows).data
+    """
+
+    fields = {}
+    datetime_fields = ()
+
+    lookups = ()
+    _plan = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        lookups = []
+
+        def compile_fields(fields):
+            plan = []
+            for key, lookup in fields.items():
+                if isinstance(lookup, dict):
+                    plan.append((key, None, compile_fields(lookup)))
+                else:
+                    lookups.append(lookup)
+                    plan.append((key, len(lookups) - 1, lookup in cls.datetime_fields))
+            return tuple(plan)
+
+        cls._plan = compile_fields(cls.fields)
+        cls.lookups = tuple(lookups)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_rows(cls, queryset):
+        """
+        Returns the queryset as `values_list()` rows in the compiled lookup order.
+        """
+        return queryset.values_list(*cls.lookups)
+
+    @staticmethod
+    def get_datetime_formatter():
+        """
+        Mirrors `serializers.DateTimeField.to_representation` with the
+        timezone and output format looked up a single time.
+        """
+        output_format = api_settings.DATETIME_FORMAT
+        field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        if output_format is None:
+            return lambda value: value or None
+
+        def enforce_timezone(value):
+            if field_timezone is not None:
+                if timezone.is_aware(value):
+                    return value.astimezone(field_timezone)
+                return timezone.make_aware(value, field_timezone)
+            if timezone.is_aware(value):
+                return timezone.make_naive(value, datetime.timezone.utc)
+            return value
+
+        if output_format.lower() == ISO_8601:
+            def format_datetime(value):
+                if not value:
+                    return None
+                value = enforce_timezone(value).isoformat()
+                if value.endswith('+00:00'):
+                    value = value[:-6] + 'Z'
+                return value
+        else:
+            def format_datetime(value):
+                if not value:
+                    return None
+                return enforce_timezone(value).strftime(output_format)
+        return format_datetime
+
+    @property
+    def data(self):
+        format_datetime = self.get_datetime_formatter()
+
+        def build(plan, row):
+            item = {}
+            for key, index, extra in plan:
+                if index is None:
+                    item[key] = build(extra, row)
+                elif extra:
+                    item[key] = format_datetime(row[index])
+                else:
+                    item[key] = row[index]
+            return item
+
+        return [build(self._plan, row) for row in self.rows]
+
+
+class BlogPostReadSerializer(ValuesSerializer):
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'content': 'content',
+        'author': {'id': 'author__id', 'username': 'author__username'},
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'is_published': 'is_published',
+    }
+    datetime_fields = ('created_at', 'updated_at')
+
+
+class CommentReadSerializer(ValuesSerializer):
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author_id',
+        'content': 'content',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    datetime_fields = ('created_at', 'updated_at')
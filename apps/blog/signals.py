@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Comment
+from .realtime import comment_broker
+from .serializers import CommentSerializer
+from .trending import record_comment
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, using, **kwargs):
+    """
+    Pushes new comments to the clients streaming their post.
+    """
+    if created:
+        comment_broker.notify(dict(CommentSerializer(instance).data), using=using)
+
+
+@receiver(post_save, sender=Comment)
+def update_post_score(sender, instance, created, using, **kwargs):
+    """
+    Adds new comments to the trending score of their post.
+    """
+    if created:
+        record_comment(instance.post_id, instance.created_at, using=using)
@@ -0,0 +1,16 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Reload the changelist with the selected object as filter value.
+    $(document).on('change', '.admin-autocomplete-filter', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('p');
+        if ($(this).val()) {
+            params.set(this.name, $(this).val());
+        } else {
+            params.delete(this.name);
+        }
+        window.location.search = params.toString();
+    });
+}
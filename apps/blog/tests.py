@@ -1,3 +1,322 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import BlogPost, Comment, CommentArchive, PostScore
+from .realtime import CommentBroker, OVERFLOW, comment_broker
+from .trending import recompute_scores
+from ..api.paginators import EstimatedCountPaginator
+from ..users.models import User
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    """
+    The number of queries of the changelists must not grow with the number
+    of rows shown or with the number of users and posts available as filters.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create_rows(self, count):
+        for i in range(count):
+            author = User.objects.create_user(f'user{User.objects.count()}', f'user{User.objects.count()}@example.com')
+            post = BlogPost.objects.create(
+                author=author, title=f'Post {i}', content='Lorem ipsum dolor sit amet ' * 3,
+            )
+            Comment.objects.create(post=post, author=author, content=f'Comment {i}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.create_rows(3)
+        expected = self.count_queries(url)
+        self.create_rows(10)
+        self.assertEqual(self.count_queries(url), expected)
+
+    def test_post_changelist(self):
+        self.assertConstantQueries(reverse('admin:blog_blogpost_changelist'))
+
+    def test_comment_changelist(self):
+        self.assertConstantQueries(reverse('admin:blog_comment_changelist'))
+
+    def test_post_autocomplete(self):
+        # Used by the post filter and field of the comment admin.
+        self.assertConstantQueries(
+            reverse('admin:autocomplete') + '?app_label=blog&model_name=comment&field_name=post&term=post'
+        )
+
+    def test_invalid_filter_value_redirects(self):
+        response = self.client.get(reverse('admin:blog_comment_changelist') + '?post__id__exact=abc')
+        self.assertRedirects(response, reverse('admin:blog_comment_changelist') + '?e=1', fetch_redirect_response=False)
+
+    def test_comment_changelist_filtered_by_post(self):
+        self.create_rows(3)
+        post = BlogPost.objects.first()
+        response = self.client.get(
+            reverse('admin:blog_comment_changelist'), {'post__id__exact': post.id},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), list(post.comments.all()))
+        self.assertContains(response, f'<option value="{post.id}" selected>', html=False)
+
+
+class TrendingTests(TestCase):
+    """
+    Scores maintained on each new comment match a batch recompute, and the
+    trending list is served from the cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        cls.posts = [
+            BlogPost.objects.create(author=cls.user, title=f'Post {i}', content='Lorem ipsum dolor sit amet ' * 3)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for i in range(count):
+            Comment.objects.create(post=post, author=self.user, content=f'Comment {i}')
+
+    def get_trending_ids(self):
+        response = self.client.get('/api/posts/trending/')
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.json()]
+
+    def test_incremental_scores_match_recompute(self):
+        self.comment(self.posts[0], 3)
+        self.comment(self.posts[1], 1)
+        incremental = dict(PostScore.objects.values_list('post_id', 'log_score'))
+
+        recompute_scores(timezone.now() - timedelta(days=1))
+        recomputed = dict(PostScore.objects.values_list('post_id', 'log_score'))
+        self.assertEqual(incremental.keys(), recomputed.keys())
+        for post_id, score in recomputed.items():
+            self.assertAlmostEqual(incremental[post_id], score, places=6)
+        self.assertEqual(self.get_trending_ids(), [self.posts[0].id, self.posts[1].id])
+
+    def test_comment_score_is_one_upsert(self):
+        # The comment INSERT and one upsert of the score, for the first comment too.
+        with self.assertNumQueries(2):
+            self.comment(self.posts[2])
+        with self.assertNumQueries(2):
+            self.comment(self.posts[2])
+        self.assertEqual(PostScore.objects.filter(post=self.posts[2]).count(), 1)
+
+    def test_recent_comments_weigh_more(self):
+        self.comment(self.posts[0], 3)
+        self.comment(self.posts[1], 1)
+        # Three comments three half-lives old weigh 3/8 of a new one.
+        Comment.objects.filter(post=self.posts[0]).update(created_at=timezone.now() - timedelta(days=3))
+        recompute_scores(timezone.now() - timedelta(days=14))
+        self.assertEqual(self.get_trending_ids(), [self.posts[1].id, self.posts[0].id])
+
+    def test_deleted_posts_are_not_listed(self):
+        self.comment(self.posts[0], 2)
+        self.comment(self.posts[1], 1)
+        self.posts[0].soft_delete()
+        self.assertEqual(self.get_trending_ids(), [self.posts[1].id])
+
+    def test_cached_list_runs_no_query(self):
+        self.comment(self.posts[0])
+        self.get_trending_ids()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_trending_ids(), [self.posts[0].id])
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+
+    def create_post(self, comments=0):
+        post = BlogPost.objects.create(author=self.user, title='Post', content='Lorem ipsum dolor sit amet ' * 3)
+        for i in range(comments):
+            Comment.objects.create(post=post, author=self.user, content=f'Comment {i}')
+        return post
+
+    def age_deletion(self, days):
+        past = timezone.now() - timedelta(days=days)
+        BlogPost.all_objects.filter(deleted_at__isnull=False).update(deleted_at=past)
+        Comment.all_objects.filter(deleted_at__isnull=False).update(deleted_at=past)
+
+    def test_soft_delete_hides_post_and_comments(self):
+        post = self.create_post(comments=2)
+        post.soft_delete()
+        self.assertFalse(BlogPost.objects.filter(pk=post.pk).exists())
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        self.assertEqual(Comment.all_objects.filter(post=post, deleted_at=post.deleted_at).count(), 2)
+
+    def test_queryset_soft_delete_hides_comments(self):
+        posts = [self.create_post(comments=2) for _ in range(2)]
+        kept = self.create_post(comments=1)
+        BlogPost.objects.filter(pk__in=[post.pk for post in posts]).soft_delete()
+        self.assertEqual(list(BlogPost.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(list(Comment.objects.values_list('post_id', flat=True)), [kept.pk])
+        self.assertEqual(Comment.all_objects.filter(post__in=posts, deleted_at__isnull=False).count(), 4)
+
+    def test_admin_delete_is_soft(self):
+        post = self.create_post(comments=1)
+        comment = Comment.objects.create(post=self.create_post(), author=self.user, content='Comment')
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.post('/admin/blog/blogpost/', {
+            'action': 'delete_selected', '_selected_action': [post.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(f'/admin/blog/comment/{comment.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BlogPost.objects.filter(pk=post.pk).exists())
+        self.assertEqual(Comment.all_objects.filter(deleted_at__isnull=False).count(), 2)
+        self.assertTrue(BlogPost.all_objects.filter(pk=post.pk).exists())
+
+    def test_api_delete_is_soft(self):
+        post = self.create_post(comments=1)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.delete(f'/api/posts/{post.pk}/').status_code, 204)
+        self.assertEqual(client.get(f'/api/posts/{post.pk}/').status_code, 404)
+        self.assertTrue(BlogPost.all_objects.filter(pk=post.pk, deleted_at__isnull=False).exists())
+
+    def test_purge_deleted(self):
+        old_post = self.create_post(comments=3)
+        old_post.soft_delete()
+        old_comment = Comment.objects.create(post=self.create_post(), author=self.user, content='Old')
+        old_comment.soft_delete()
+        bulk_deleted_post = self.create_post(comments=2)
+        BlogPost.objects.filter(pk=bulk_deleted_post.pk).soft_delete()
+        self.age_deletion(days=31)
+        recent_post = self.create_post(comments=1)
+        recent_post.soft_delete()
+
+        out = StringIO()
+        call_command('purge_deleted', batch_size=2, stdout=out)
+        self.assertIn("Deleted 2 posts and 6 comments.", out.getvalue())
+        self.assertFalse(BlogPost.all_objects.filter(pk__in=[old_post.pk, bulk_deleted_post.pk]).exists())
+        self.assertFalse(Comment.all_objects.filter(pk=old_comment.pk).exists())
+        self.assertEqual(Comment.all_objects.filter(post=recent_post).count(), 1)
+        self.assertTrue(BlogPost.all_objects.filter(pk=recent_post.pk).exists())
+
+    def test_archive_comments(self):
+        post = self.create_post(comments=3)
+        old_ids = list(Comment.objects.order_by('id').values_list('id', flat=True)[:2])
+        Comment.objects.filter(id__in=old_ids).update(created_at=timezone.now() - timedelta(days=400))
+
+        out = StringIO()
+        call_command('archive_comments', batch_size=1, stdout=out)
+        self.assertIn("Archived 2 comments.", out.getvalue())
+        self.assertEqual(sorted(CommentArchive.objects.values_list('id', flat=True)), old_ids)
+        self.assertEqual(list(CommentArchive.objects.values_list('post_id', flat=True).distinct()), [post.pk])
+        self.assertEqual(Comment.all_objects.count(), 1)
+
+    def test_post_list_is_newest_first(self):
+        posts = [self.create_post() for _ in range(3)]
+        BlogPost.objects.filter(pk=posts[0].pk).update(created_at=timezone.now() + timedelta(hours=1))
+        ids = [post['id'] for post in self.client.get('/api/posts/').json()['results']]
+        self.assertEqual(ids, [posts[0].pk, posts[2].pk, posts[1].pk])
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """
+    On PostgreSQL the table estimate counts soft-deleted rows too, they must
+    be subtracted for querysets of the default manager.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        for i in range(5):
+            BlogPost.objects.create(author=user, title=f'Post {i}', content='Lorem ipsum dolor sit amet ' * 3)
+        BlogPost.objects.filter(title__in=['Post 0', 'Post 1']).soft_delete()
+
+    def count(self, queryset, estimate=20000):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(EstimatedCountPaginator, 'get_table_estimate', return_value=estimate):
+            return EstimatedCountPaginator(queryset, 10).count
+
+    def test_soft_deleted_rows_are_subtracted(self):
+        self.assertEqual(self.count(BlogPost.objects.all()), 20000 - 2)
+
+    def test_unfiltered_base_manager(self):
+        self.assertEqual(self.count(BlogPost.all_objects.all()), 20000)
+        self.assertEqual(self.count(User.objects.all()), 20000)
+
+    def test_exact_count(self):
+        self.assertEqual(self.count(BlogPost.objects.filter(title='Post 2')), 1)
+        self.assertEqual(self.count(BlogPost.objects.all(), estimate=5000), 3)
+
+
+class CommentBrokerTests(TestCase):
+    """
+    The in-process broker used on databases without LISTEN/NOTIFY.
+    """
+
+    @staticmethod
+    async def drain(subscription):
+        # Let the callbacks scheduled by `publish` run.
+        await asyncio.sleep(0)
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    async def test_fan_out_to_the_subscribers_of_the_post(self):
+        broker = CommentBroker()
+        first, second, other_post = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+        broker.publish({'id': 10, 'post': 1})
+        self.assertEqual(await self.drain(first), [{'id': 10, 'post': 1}])
+        self.assertEqual(await self.drain(second), [{'id': 10, 'post': 1}])
+        self.assertEqual(await self.drain(other_post), [])
+
+        broker.unsubscribe(first)
+        broker.publish({'id': 11, 'post': 1})
+        self.assertEqual(await self.drain(first), [])
+        self.assertEqual(await self.drain(second), [{'id': 11, 'post': 1}])
+
+    @override_settings(COMMENT_STREAM_QUEUE_SIZE=2)
+    async def test_slow_subscriber_overflows(self):
+        broker = CommentBroker()
+        subscription = broker.subscribe(1)
+        for comment_id in range(5):
+            broker.publish({'id': comment_id, 'post': 1})
+        self.assertEqual(await self.drain(subscription), [OVERFLOW])
+
+    async def test_new_comments_are_published_on_commit(self):
+        user = await User.objects.acreate(username='alice', email='alice@example.com')
+        post = await BlogPost.objects.acreate(author=user, title='Post', content='Lorem ipsum dolor sit amet ' * 3)
+        subscription = comment_broker.subscribe(post.id)
+        try:
+            def create_comment():
+                with self.captureOnCommitCallbacks(execute=True):
+                    return Comment.objects.create(post=post, author=user, content='hello')
+
+            comment = await sync_to_async(create_comment)()
+            events = await self.drain(subscription)
+        finally:
+            comment_broker.unsubscribe(subscription)
+        self.assertEqual([(event['id'], event['post'], event['content']) for event in events], [
+            (comment.id, post.id, 'Hello'),
+        ])
@@ -0,0 +1,93 @@
+import datetime
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import BlogPost, Comment, PostScore
+from .serializers import BlogPostReadSerializer
+
+# Comment times are measured from here, so that weights stay small numbers.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+TRENDING_CACHE_KEY = 'blog:trending'
+
+
+def log_weight(created_at):
+    """
+    Logarithm of the weight a comment made at `created_at` adds to the score
+    of its post. It grows by ln(2) every `TRENDING_HALF_LIFE`.
+    """
+    half_life = settings.TRENDING_HALF_LIFE.total_seconds()
+    return (created_at - EPOCH).total_seconds() / half_life * math.log(2)
+
+
+def log_add_exp(a, b):
+    """
+    ln(e^a + e^b) without overflowing.
+    """
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def record_comment(post_id, created_at, using=DEFAULT_DB_ALIAS):
+    """
+    Adds a new comment to the score of its post with a single upsert, the
+    same `log_add_exp` computed by the database so that concurrent comments
+    on a post, the first ones included, are all counted.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table, score = qn(PostScore._meta.db_table), qn('log_score')
+    # SQLite has no GREATEST, its MAX takes several arguments instead.
+    greatest = 'MAX' if connection.vendor == 'sqlite' else 'GREATEST'
+    updated_at = PostScore._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('post_id')}, {score}, {qn('updated_at')}) VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({qn('post_id')}) DO UPDATE SET "
+            f"{score} = {greatest}({table}.{score}, EXCLUDED.{score}) "
+            f"+ LN(1 + EXP(-ABS({table}.{score} - EXCLUDED.{score}))), "
+            f"{qn('updated_at')} = EXCLUDED.{qn('updated_at')}",
+            [post_id, log_weight(created_at), updated_at],
+        )
+
+
+def recompute_scores(since, batch_size=1000):
+    """
+    Rebuilds the score table from the live comments created since `since`.
+
+    Older comments weigh next to nothing and are left out, which also drops
+    the posts nobody commented on lately. Deleted comments stop counting.
+    Comments created while this runs may be missing until the next run.
+    """
+    scores = {}
+    rows = Comment.objects.filter(created_at__gte=since).values_list('post_id', 'created_at')
+    for post_id, created_at in rows.iterator(chunk_size=batch_size):
+        weight = log_weight(created_at)
+        scores[post_id] = log_add_exp(scores[post_id], weight) if post_id in scores else weight
+
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(
+            (PostScore(post_id=post_id, log_score=score) for post_id, score in scores.items()),
+            batch_size=batch_size,
+        )
+    cache.delete(TRENDING_CACHE_KEY)
+    return len(scores)
+
+
+def get_trending():
+    """
+    Returns the `TRENDING_SIZE` posts with the highest score, serialized like
+    the post list. The list is cached for `TRENDING_CACHE_TIMEOUT` seconds,
+    so most calls are a single cache read.
+    """
+    data = cache.get(TRENDING_CACHE_KEY)
+    if data is None:
+        queryset = BlogPost.objects.filter(score__isnull=False).order_by('-score__log_score')
+        rows = BlogPostReadSerializer.get_rows(queryset)[:settings.TRENDING_SIZE]
+        data = BlogPostReadSerializer(rows).data
+        cache.set(TRENDING_CACHE_KEY, data, settings.TRENDING_CACHE_TIMEOUT)
+    return data
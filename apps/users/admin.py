@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import F
+from .authentication import forget_token_versions
 from .models import User
+from ..api.paginators import EstimatedCountPaginator
 
 
 class CustomUserAdmin(UserAdmin):
@@ -11,6 +14,10 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('-date_joined',)
     readonly_fields = ('last_login', 'date_joined')
 
+    # Оценка количества строк вместо полного COUNT(*) на больших таблицах
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     # Добавление полей для создания и редактирования пользователей
     fieldsets = (
         (None, {'fields': ('username', 'email', 'password')}),
@@ -30,13 +37,20 @@ class CustomUserAdmin(UserAdmin):
     actions = ['make_admin', 'make_user']
 
     def make_admin(self, request, queryset):
-        queryset.update(role='admin')
+        self._set_role(queryset, 'admin')
     make_admin.short_description = "Назначить выбранных пользователей администраторами"
 
     def make_user(self, request, queryset):
-        queryset.update(role='user')
+        self._set_role(queryset, 'user')
     make_user.short_description = "Назначить выбранных пользователей обычными пользователями"
 
+    def _set_role(self, queryset, role):
+        # Смена роли делает недействительными ранее выданные токены
+        queryset = queryset.exclude(role=role)
+        user_ids = list(queryset.values_list('id', flat=True))
+        queryset.update(role=role, token_version=F('token_version') + 1)
+        forget_token_versions(user_ids)
+
 
 # Регистрируем модель и кастомную админку
 admin.site.register(User, CustomUserAdmin)
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+
+ROLE_CLAIM = 'role'
+USERNAME_CLAIM = 'username'
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+def token_version_cache_key(user_id):
+    return f'users:token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Returns the current token version of an active user, or None if the user
+    doesn't exist or is inactive. Cached for `TOKEN_VERSION_CACHE_TIMEOUT`
+    seconds, so most requests don't query the database.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list('token_version', flat=True)
+            .first()
+        )
+        # -1 caches "no such active user" as well
+        cache.set(key, -1 if version is None else version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return None if version == -1 else version
+
+
+def forget_token_versions(user_ids):
+    cache.delete_many([token_version_cache_key(user_id) for user_id in user_ids])
+
+
+class ClaimsUser:
+    """
+    Request user built from the claims of a validated access token.
+
+    `id`, `username` and `role` come from the token. Any other attribute
+    loads the `User` row on first access and is read from it, so views that
+    only check ownership or the role never query the users table.
+    """
+
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, token):
+        self.token = token
+
+    @cached_property
+    def id(self):
+        return self.token[api_settings.USER_ID_CLAIM]
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def username(self):
+        return self.token[USERNAME_CLAIM]
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @cached_property
+    def user(self):
+        try:
+            return User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+
+    def __getattr__(self, attr):
+        if attr.startswith('__') or attr == 'token':
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+    def __eq__(self, other):
+        if isinstance(other, (ClaimsUser, User)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f"User: {self.username} (role: {self.role})"
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the signed role and username claims
+    instead of loading the user. The token version claim is compared with the
+    user's current version, so tokens issued before a role change,
+    deactivation or rename are rejected. Tokens without the claims fall back
+    to the default database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token or TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        version = get_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+        if validated_token[TOKEN_VERSION_CLAIM] != version:
+            raise AuthenticationFailed("Token is outdated, please log in again.", code='token_outdated')
+        return ClaimsUser(validated_token)
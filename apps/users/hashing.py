@@ -0,0 +1,17 @@
+"""
+Entry points of the password hashing processes used by `provisioning`.
+
+Spawned workers import this module before Django is set up, so it must
+not import any model at module level.
+"""
+
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def init_worker():
+    django.setup()
+
+
+def hash_password(password):
+    return make_password(password)
@@ -0,0 +1,35 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from ...provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users in bulk from a CSV file with the columns username, email, password "
+        "and optionally role. Prints one JSON line per row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help="Password hashing processes.")
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], newline='', encoding='utf-8') as csv_file:
+            rows = [
+                {key: value for key, value in row.items() if value not in (None, '')}
+                for row in csv.DictReader(csv_file)
+            ]
+
+        created = failed = 0
+        for result in provision_users(rows, options['batch_size'], options['workers']):
+            self.stdout.write(json.dumps(result))
+            if result['status'] == 'created':
+                created += 1
+            else:
+                failed += 1
+
+        self.stderr.write(self.style.SUCCESS(f"Created {created} users, {failed} rows failed."))
@@ -61,8 +61,13 @@ class User(AbstractUser):
     Attributes:
         email (EmailField): The user's unique email address.
         role (CharField): The role of the user (admin or user).
+        token_version (PositiveIntegerField): Embedded in issued JWTs. Bumped when
+            a field carried as a token claim changes, which rejects older tokens.
     """
 
+    # Fields whose change invalidates the claims of issued tokens
+    TOKEN_CLAIM_FIELDS = ('username', 'role', 'is_active')
+
     ROLE_CHOICES = [
         ('admin', 'Admin'),
         ('user', 'User'),
@@ -75,8 +80,56 @@ class User(AbstractUser):
         default='user',
         verbose_name='Role',
     )
+    token_version = models.PositiveIntegerField(default=0, editable=False, verbose_name='Token version')
 
     objects = CustomUserManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = {
+            field: getattr(instance, field)
+            for field in cls.TOKEN_CLAIM_FIELDS
+            if field in instance.__dict__
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """
+        Reloaded claim fields are the new reference for `save`.
+        """
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._loaded_claims = {
+            **getattr(self, '_loaded_claims', {}),
+            **{
+                field: getattr(self, field)
+                for field in self.TOKEN_CLAIM_FIELDS
+                if (fields is None or field in fields) and field in self.__dict__
+            },
+        }
+
+    def save(self, *args, **kwargs):
+        """
+        Bumps `token_version` when a field carried in the tokens changed.
+        The bump is done by the database, so concurrent saves all count; the
+        new value is loaded again when read.
+        """
+        loaded_claims = getattr(self, '_loaded_claims', {})
+        claims_changed = any(getattr(self, field) != value for field, value in loaded_claims.items())
+        if claims_changed:
+            self.token_version = models.F('token_version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if claims_changed:
+            # Deferred, so the next read fetches the value the database computed.
+            del self.__dict__['token_version']
+        self._loaded_claims = {field: getattr(self, field) for field in self.TOKEN_CLAIM_FIELDS}
+
+        if claims_changed:
+            from .authentication import forget_token_versions
+            forget_token_versions([self.pk])
+
     def __str__(self):
         return f"User: {self.username} (role: {self.role}) {self.email}"
@@ -7,4 +7,13 @@ class IsProfileOwnerOrAdmin(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj == request.user or request.user.role == 'admin'
+        return obj.pk == request.user.pk or request.user.role == 'admin'
+
+
+class IsAdminRole(BasePermission):
+    """
+    Permission granted only to users with the 'admin' role.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.role == 'admin')
@@ -0,0 +1,130 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .hashing import init_worker, hash_password
+from .models import User
+from .serializers import ProvisionUserSerializer
+
+
+def _make_executor(max_workers, count):
+    """
+    Returns a process pool to hash `count` passwords, or None when hashing
+    inline is cheaper. Hashing is CPU bound by design, so threads would not
+    help. Workers are spawned rather than forked so they never inherit the
+    parent's database connections.
+    """
+    if max_workers <= 1 or count < max_workers:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+    )
+
+
+def _hash_passwords(passwords, executor, max_workers):
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (max_workers * 4))
+    return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+
+def provision_users(rows, batch_size=500, max_workers=None):
+    """
+    Creates users in bulk and yields one result per input row, as soon as
+    its batch is done:
+
+        {'row': 0, 'username': 'alice', 'status': 'created', 'id': 42}
+        {'row': 1, 'username': 'bob', 'status': 'error', 'errors': {...}}
+
+    Rows are validated without touching the database. Usernames and emails
+    are checked against existing users in a single query. Passwords are
+    hashed in parallel and the users are inserted with `bulk_create`. A batch
+    that hits a concurrent insert falls back to row by row inserts.
+    """
+    if max_workers is None:
+        max_workers = settings.PROVISIONING_HASH_WORKERS
+
+    valid = []
+    seen_usernames, seen_emails = set(), set()
+    for index, row in enumerate(rows):
+        serializer = ProvisionUserSerializer(data=row)
+        if not serializer.is_valid():
+            username = row.get('username') if isinstance(row, dict) else None
+            yield {'row': index, 'username': username, 'status': 'error', 'errors': serializer.errors}
+            continue
+        data = serializer.validated_data
+        data['email'] = User.objects.normalize_email(data['email'])
+
+        errors = {}
+        if data['username'] in seen_usernames:
+            errors['username'] = ["Duplicate username in this request."]
+        if data['email'] in seen_emails:
+            errors['email'] = ["Duplicate email in this request."]
+        if errors:
+            yield {'row': index, 'username': data['username'], 'status': 'error', 'errors': errors}
+            continue
+        seen_usernames.add(data['username'])
+        seen_emails.add(data['email'])
+        valid.append((index, data))
+
+    existing_usernames, existing_emails = set(), set()
+    if valid:
+        for username, email in User.objects.filter(
+            Q(username__in=seen_usernames) | Q(email__in=seen_emails)
+        ).values_list('username', 'email'):
+            existing_usernames.add(username)
+            existing_emails.add(email)
+
+    pending = []
+    for index, data in valid:
+        errors = {}
+        if data['username'] in existing_usernames:
+            errors['username'] = ["A user with that username already exists."]
+        if data['email'] in existing_emails:
+            errors['email'] = ["A user with that email already exists."]
+        if errors:
+            yield {'row': index, 'username': data['username'], 'status': 'error', 'errors': errors}
+        else:
+            pending.append((index, data))
+
+    executor = _make_executor(max_workers, len(pending))
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            hashes = _hash_passwords([data['password'] for _, data in batch], executor, max_workers)
+            users = [
+                User(username=data['username'], email=data['email'], role=data['role'], password=password)
+                for (_, data), password in zip(batch, hashes)
+            ]
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+            except IntegrityError:
+                yield from _create_one_by_one(batch, users)
+                continue
+            for (index, data), user in zip(batch, users):
+                yield {'row': index, 'username': data['username'], 'status': 'created', 'id': user.pk}
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _create_one_by_one(batch, users):
+    for (index, data), user in zip(batch, users):
+        user.pk = None
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            yield {
+                'row': index, 'username': data['username'], 'status': 'error',
+                'errors': {'non_field_errors': ["A user with that username or email already exists."]},
+            }
+        else:
+            yield {'row': index, 'username': data['username'], 'status': 'created', 'id': user.pk}
@@ -1,6 +1,11 @@
 from django.contrib.auth import authenticate
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import ROLE_CLAIM, USERNAME_CLAIM, TOKEN_VERSION_CLAIM
 from .models import User
 
 
@@ -22,7 +27,31 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+class ProvisionUserSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk provisioning request. Uniqueness is checked
+    for the whole request at once by `provision_users`, not per row.
+    """
+
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(write_only=True)
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, default='user')
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        """
+        Embeds the username, role and token version as signed claims, so
+        requests can be authorized without loading the user.
+        """
+        token = super().get_token(user)
+        token[USERNAME_CLAIM] = user.username
+        token[ROLE_CLAIM] = user.role
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -36,6 +65,26 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refuses to refresh tokens whose claims are outdated (role changed, user
+    renamed or deactivated). The new access token copies the claims of the
+    refresh token, so they are only valid while the versions match.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if TOKEN_VERSION_CLAIM in refresh:
+            is_current = User.objects.filter(
+                pk=refresh[api_settings.USER_ID_CLAIM],
+                is_active=True,
+                token_version=refresh[TOKEN_VERSION_CLAIM],
+            ).exists()
+            if not is_current:
+                raise InvalidToken("Token is outdated, please log in again.")
+        return super().validate(attrs)
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
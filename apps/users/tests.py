@@ -1,3 +1,293 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import provisioning
+from .authentication import ClaimsJWTAuthentication, ClaimsUser
+from .models import User
+from .serializers import CustomTokenObtainPairSerializer
+from ..blog.models import BlogPost
+
+
+class UserAdminChangelistQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:users_user_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_user_changelist(self):
+        User.objects.create_user('user0', 'user0@example.com')
+        expected = self.count_queries()
+        for i in range(1, 11):
+            User.objects.create_user(f'user{i}', f'user{i}@example.com')
+        self.assertEqual(self.count_queries(), expected)
+
+
+def provision(rows, **kwargs):
+    return {result['row']: result for result in provisioning.provision_users(rows, max_workers=1, **kwargs)}
+
+
+class ProvisionUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('alice', 'alice@example.com', 'password')
+
+    def test_creates_users(self):
+        results = provision([
+            {'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'},
+            {'username': 'carol', 'email': 'carol@EXAMPLE.com', 'password': 'secret', 'role': 'admin'},
+        ], batch_size=1)
+        self.assertEqual([result['status'] for result in results.values()], ['created', 'created'])
+        carol = User.objects.get(username='carol')
+        self.assertEqual((carol.id, carol.email, carol.role), (results[1]['id'], 'carol@example.com', 'admin'))
+        self.assertTrue(carol.check_password('secret'))
+
+    def test_invalid_rows(self):
+        results = provision([
+            {'username': 'bob', 'email': 'not an email', 'password': 'secret'},
+            'not a row',
+        ])
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertIn('email', results[0]['errors'])
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertFalse(User.objects.filter(username='bob').exists())
+
+    def test_duplicates_in_the_request(self):
+        results = provision([
+            {'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'},
+            {'username': 'bob', 'email': 'bob2@example.com', 'password': 'secret'},
+            {'username': 'bobby', 'email': 'bob@example.com', 'password': 'secret'},
+        ])
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertEqual(results[1]['errors'], {'username': ["Duplicate username in this request."]})
+        self.assertEqual(results[2]['errors'], {'email': ["Duplicate email in this request."]})
+        self.assertEqual(User.objects.filter(username__startswith='bob').count(), 1)
+
+    def test_existing_users(self):
+        results = provision([
+            {'username': 'alice', 'email': 'new@example.com', 'password': 'secret'},
+            {'username': 'bob', 'email': 'alice@example.com', 'password': 'secret'},
+        ])
+        self.assertEqual(results[0]['errors'], {'username': ["A user with that username already exists."]})
+        self.assertEqual(results[1]['errors'], {'email': ["A user with that email already exists."]})
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_concurrent_insert_falls_back_to_row_by_row(self):
+        hash_passwords = provisioning._hash_passwords
+
+        def hash_while_carol_registers(*args):
+            User.objects.create_user('carol', 'carol@elsewhere.com')
+            return hash_passwords(*args)
+
+        with mock.patch.object(provisioning, '_hash_passwords', side_effect=hash_while_carol_registers):
+            results = provision([
+                {'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'},
+                {'username': 'carol', 'email': 'carol@example.com', 'password': 'secret'},
+                {'username': 'dave', 'email': 'dave@example.com', 'password': 'secret'},
+            ])
+        self.assertEqual([result['status'] for result in results.values()], ['created', 'error', 'created'])
+        self.assertIn('non_field_errors', results[1]['errors'])
+        self.assertEqual(User.objects.get(username='carol').email, 'carol@elsewhere.com')
+        self.assertEqual(User.objects.get(username='dave').id, results[2]['id'])
+
+
+@override_settings(PROVISIONING_HASH_WORKERS=1)
+class BulkProvisionViewTests(TestCase):
+    url = '/api/users/provision/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'password', role='admin')
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+
+    def post(self, user, data):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(self.url, data, format='json')
+
+    def test_streams_one_json_line_per_row(self):
+        response = self.post(self.admin, [
+            {'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'},
+            {'username': 'alice', 'email': 'other@example.com', 'password': 'secret'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        results = [json.loads(line) for line in lines]
+        self.assertEqual([(r['row'], r['username'], r['status']) for r in results], [
+            (1, 'alice', 'error'), (0, 'bob', 'created'),
+        ])
+        self.assertEqual(User.objects.get(username='bob').id, results[1]['id'])
+
+    def test_error_ends_the_stream_with_an_error_line(self):
+        def provision_users(rows):
+            yield {'row': 0, 'username': 'bob', 'status': 'created', 'id': 1}
+            raise DatabaseError("connection lost")
+
+        with mock.patch('apps.api.views.provision_users', provision_users), self.assertLogs('apps.api.views', 'ERROR'):
+            response = self.post(self.admin, [{'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'}])
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([json.loads(line)['status'] for line in lines], ['created', 'error'])
+
+    async def test_streams_under_asgi(self):
+        token = await sync_to_async(lambda: str(CustomTokenObtainPairSerializer.get_token(self.admin).access_token))()
+        response = await AsyncClient().post(
+            self.url, [{'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'}],
+            content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(json.loads(lines[0])['status'], 'created')
+        self.assertTrue(await User.objects.filter(username='bob').aexists())
+
+    def test_admins_only(self):
+        response = self.post(self.user, [{'username': 'bob', 'email': 'bob@example.com', 'password': 'secret'}])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(APIClient().post(self.url, [], format='json').status_code, 401)
+        self.assertFalse(User.objects.filter(username='bob').exists())
+
+    def test_expects_a_list(self):
+        response = self.post(self.admin, {'username': 'bob'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    Access tokens carry the username, role and token version of the user.
+    Requests are authorized from them, and tokens issued before one of those
+    changed are rejected, on requests and on refresh.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password', role='admin')
+
+    def setUp(self):
+        # Ids are reused between tests, cached token versions must not be.
+        cache.clear()
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+
+    def get(self, token, url='/api/comments/'):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client.get(url)
+
+    def refresh_token(self):
+        return APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+
+    def assertOutdated(self):
+        response = self.get(self.refresh.access_token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], "Token is outdated, please log in again.")
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_current_token(self):
+        self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+        response = self.refresh_token()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response.json()['access']).status_code, 200)
+
+    def test_rename(self):
+        self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'alicia'
+        user.save()
+        self.assertOutdated()
+
+    def test_role_change(self):
+        self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        user.role = 'admin'
+        user.save(update_fields=['role'])
+        self.assertOutdated()
+
+    def test_deactivation(self):
+        self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        response = self.get(self.refresh.access_token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_unrelated_change_keeps_tokens(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Alice'
+        user.save()
+        self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+        self.assertEqual(self.refresh_token().status_code, 200)
+
+    def test_concurrent_changes_all_bump_the_version(self):
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        first.role = 'admin'
+        first.save()
+        second.username = 'alicia'
+        second.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 2)
+        # Read back from the database once saved.
+        self.assertEqual(second.token_version, 2)
+
+    def test_refreshed_claims_dont_bump_the_version(self):
+        user = User.objects.get(pk=self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(role='admin')
+        user.refresh_from_db()
+        user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 0)
+
+    def test_admin_role_actions(self):
+        for action in ('make_admin', 'make_user'):
+            with self.subTest(action=action):
+                cache.clear()
+                self.refresh = CustomTokenObtainPairSerializer.get_token(User.objects.get(pk=self.user.pk))
+                self.assertEqual(self.get(self.refresh.access_token).status_code, 200)
+
+                self.client.force_login(self.admin)
+                response = self.client.post(reverse('admin:users_user_changelist'), {
+                    'action': action, '_selected_action': [self.user.pk],
+                })
+                self.assertEqual(response.status_code, 302)
+                self.assertOutdated()
+
+    def test_legacy_tokens_are_checked_against_the_database(self):
+        refresh = RefreshToken.for_user(self.user)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        user, _ = ClaimsJWTAuthentication().authenticate(request)
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.pk, self.user.pk)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(refresh.access_token).status_code, 401)
+
+    def test_requests_are_authorized_without_loading_the_user(self):
+        post = BlogPost.objects.create(author=self.user, title='Post', content='Lorem ipsum dolor sit amet ' * 3)
+        token = self.refresh.access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # Also caches the token version, as after the first request of a user.
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertIsInstance(ClaimsJWTAuthentication().authenticate(request)[0], ClaimsUser)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.patch(f'/api/posts/{post.pk}/', {'title': 'Edited'}, format='json').status_code, 200)
+            self.assertEqual(client.get('/api/posts/').status_code, 200)
+        user_queries = [query['sql'] for query in queries if 'FROM "users_user"' in query['sql']]
+        self.assertEqual(user_queries, [])
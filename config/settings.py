@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 
@@ -23,7 +25,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-_^-kf#3@$l!e*+g2nns2q6fp5za_wplkp00gyql+aq+s=r2^4o'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Set DJANGO_DEBUG=0 to turn it off.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['*']
 
@@ -54,26 +57,81 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'ALGORITHM': 'HS256',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.CustomTokenRefreshSerializer',
 }
 
+# How long the token version of a user is cached by ClaimsJWTAuthentication (seconds).
+# This bounds how long a token issued before a role change keeps working.
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ClaimsJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.api.renderers.ORJSONRenderer',
+        'apps.api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.api.parsers.ORJSONParser',
+        'apps.api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
 
+# How long a response stored for an Idempotency-Key is replayed, and after
+# how long a request still running with a key is considered abandoned
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_KEY_LEASE = timedelta(seconds=60)
+
+# Processes hashing passwords during bulk user provisioning
+PROVISIONING_HASH_WORKERS = os.cpu_count() or 1
+
+# Comment stream (SSE): events buffered per client, seconds between keep-alives
+COMMENT_STREAM_QUEUE_SIZE = 100
+COMMENT_STREAM_HEARTBEAT = 15
+
+# Trending posts: time for a comment's weight to halve (changing it needs
+# `recompute_trending`), posts listed, seconds the list is cached
+TRENDING_HALF_LIFE = timedelta(hours=24)
+TRENDING_SIZE = 20
+TRENDING_CACHE_TIMEOUT = 60
+
+# Responses below this size (in bytes) are not worth compressing
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.api.middleware.QueryBudgetMiddleware',
 ]
 
+# Query budgets declared on the views, set with the QUERY_BUDGET environment
+# variable: with 'raise' a request running more queries than its budget
+# fails, with 'log' it is logged, anything else turns the check off. The
+# default is 'raise' in development (DEBUG) and under `manage.py test`.
+TESTING = sys.argv[1:2] == ['test']
+QUERY_BUDGET = os.environ.get('QUERY_BUDGET', 'raise' if DEBUG or TESTING else 'off')
+QUERY_BUDGET_ENABLED = QUERY_BUDGET in ('raise', 'log')
+QUERY_BUDGET_RAISE = QUERY_BUDGET == 'raise'
+
+# Queries slower than this are logged with the code that ran them, unless
+# turned off with SLOW_QUERY_LOG=0
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG', '1') == '1'
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_EXPLAIN = False
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -105,6 +163,12 @@ DATABASES = {
         'PASSWORD': '1234',
         'HOST': '127.0.0.1',
         'PORT': '5432',
+        # Keep connections open between requests and check them before reuse.
+        # Under ASGI each request runs its sync code in a short-lived thread
+        # and persistent connections leak, so config.asgi sets
+        # DJANGO_CONN_MAX_AGE=0.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -0,0 +1,9 @@
+"""
+URL configuration for the API-only settings profile (`config.settings_api`).
+"""
+from django.urls import path, include
+
+
+urlpatterns = [
+    path('api/', include('apps.api.urls')),
+]
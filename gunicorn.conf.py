@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration.
+
+    DJANGO_SETTINGS_MODULE=config.settings_api gunicorn config.wsgi -c gunicorn.conf.py
+
+The comment stream (Server-Sent Events) needs the ASGI application, and
+answers 501 under WSGI. Serve it with uvicorn:
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+config.asgi turns persistent database connections off (CONN_MAX_AGE 0,
+through DJANGO_CONN_MAX_AGE): under ASGI they would leak, one per thread
+that ran a request.
+
+With `preload_app` the application is imported once in the master and the
+workers are forked from it, so they start without paying the import cost
+again and share the loaded code pages.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def pre_fork(server, worker):
+    """
+    Close any database connection the master opened while loading the app.
+    A socket inherited by the forked workers would be shared between
+    processes and corrupt the protocol state; each worker opens its own
+    connection on its first query instead.
+    """
+    from django.db import connections
+
+    connections.close_all()